@@ -1,18 +1,36 @@
-from json_validator import JSONValidator
 #!/usr/bin/env python3
 
+import atexit
+import contextlib
+import functools
+import io
 import json
+import os
+import signal
 import subprocess
 import sys
 import shutil
 import argparse
+import itertools
 import random
 import re
+import shlex
 import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from json_validator import JSONValidator
+from validate_bids_model import validate_json as validate_model_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # ------------------------------
@@ -22,10 +40,45 @@ from typing import List, Optional
 CONFIG_FILE = "config.json"
 CONTAINER_CONFIG_FILE = "container.json"
 LOG_FILE = "run_bidspm.log"
+CONTAINER_ENTRYPOINT = "bidspm"  # bidspm CLI inside the container (used by batch scripts)
 DEBUG = True  # Set to False to suppress debug output
+SLURM_POLL_INTERVAL = 30  # Seconds between squeue polls with --scheduler slurm --wait
+_LOG_LOCK = threading.Lock()  # Serializes log writes from parallel subject workers
+_LOG_FH = None  # Log file handle, kept open for the lifetime of the process
+_RUN_STAMP = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"  # Shared by all tmp dirs of this run
+_RUN_SEQ = itertools.count()  # Numbers the tmp dirs of this run
+_JSON_CACHE: Dict[tuple, dict] = {}  # Parsed JSON files keyed by (path, st_mtime_ns)
+
 
+def _read_json(path, raw: Optional[bytes] = None) -> dict:
+    """Parse a JSON file, using orjson (faster, works on raw bytes) when it is installed.
 
-@dataclass
+    Results are cached per (path, mtime), so a file read again in the same run
+    is only parsed once. Callers must treat the returned dict as read-only.
+    `raw` passes file content the caller has already read.
+    """
+    path = Path(path)
+    key = (str(path), path.stat().st_mtime_ns)
+    data = _JSON_CACHE.get(key)
+    if data is None:
+        if raw is None:
+            raw = path.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        _JSON_CACHE[key] = data
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def _path_exists(path: str) -> bool:
+    """os.path.exists(), memoized for the run.
+
+    Config, container config and model files are checked from several places
+    (auto-selection, main, the loaders); this stats each of them only once.
+    """
+    return os.path.exists(path)
+
+
+@dataclass(frozen=True)
 class Config:
     WD: Path
     BIDS_DIR: Path
@@ -39,15 +92,45 @@ class Config:
     SUBJECTS: Optional[List[str]] = None
     ROI: Optional[bool] = None
     ROI_CONFIG: Optional[dict] = None
+    FWHM_STR: str = field(init=False)  # FWHM formatted once for container arguments
+
+    def __post_init__(self):
+        object.__setattr__(self, "FWHM_STR", f"{self.FWHM}")  # Frozen: assign via object.__setattr__
+
+
+def _find_missing_dirs(paths: List[Path]) -> List[Path]:
+    """Return the paths that are not existing directories.
+
+    Paths that share a parent (e.g. rawdata/ and derivatives/ under the study
+    folder) are checked with a single os.scandir of the parent instead of one
+    stat() per path. A name that is not in the listing is confirmed with is_dir(),
+    since the listing can differ in case or Unicode normalization from the configured
+    path (macOS) or be unreadable (execute-only directories).
+    """
+    by_parent: Dict[Path, List[Path]] = {}
+    for path in paths:
+        by_parent.setdefault(path.parent, []).append(path)
+
+    missing = []
+    for parent, children in by_parent.items():
+        if len(children) == 1 or any(child.name in ("", ".", "..") for child in children):
+            missing.extend(child for child in children if not child.is_dir())
+            continue
+        try:
+            with os.scandir(parent) as it:
+                dir_names = {entry.name for entry in it if entry.is_dir()}
+        except OSError:
+            dir_names = set()
+        missing.extend(child for child in children if child.name not in dir_names and not child.is_dir())
+    return missing
 
 
 def load_config(config_file: str) -> Config:
     """Load configuration from JSON file."""
-    if not Path(config_file).exists():
+    if not _path_exists(os.fspath(config_file)):
         log_error(f"Config file '{config_file}' not found.")
 
-    with open(config_file) as f:
-        data = json.load(f)
+    data = _read_json(config_file)
 
     # SESSION-Unterstützung: falls vorhanden, generiere selection.json
     session = data.get("SESSION")
@@ -79,6 +162,17 @@ def load_config(config_file: str) -> Config:
     fmriprep_dir = Path(data["FMRIPREP_DIR"])
     verbosity = data.get("VERBOSITY", 3)
 
+    # Path validations (done once here; later code relies on these directories existing)
+    missing_dirs = _find_missing_dirs([wd, bids_dir, derivatives_dir, fmriprep_dir])
+    if wd in missing_dirs:
+        log_error(f"Working directory '{wd}' does not exist.")
+    if bids_dir in missing_dirs:
+        log_error(f"BIDS directory '{bids_dir}' does not exist.")
+    if derivatives_dir in missing_dirs:
+        log_error(f"Derivatives directory '{derivatives_dir}' does not exist.")
+    if fmriprep_dir in missing_dirs:
+        log_error(f"fMRIPrep directory '{fmriprep_dir}' does not exist.")
+
     return Config(
         WD=wd,
         BIDS_DIR=bids_dir,
@@ -95,7 +189,7 @@ def load_config(config_file: str) -> Config:
     )
 
 
-@dataclass
+@dataclass(frozen=True)
 class ContainerConfig:
     container_type: str  # "docker" or "apptainer"
     docker_image: str = ""
@@ -103,11 +197,10 @@ class ContainerConfig:
 
 
 def load_container_config(config_file: str) -> ContainerConfig:
-    if not Path(config_file).exists():
+    if not _path_exists(os.fspath(config_file)):
         log_error(f"Container config file '{config_file}' not found.")
 
-    with open(config_file) as f:
-        data = json.load(f)
+    data = _read_json(config_file)
 
     container_type = data.get("container_type", "docker").lower()
     if container_type not in ["docker", "apptainer"]:
@@ -120,28 +213,27 @@ def load_container_config(config_file: str) -> ContainerConfig:
     )
 
 
-def detect_platform_and_suggest_container():
-    """Detect platform and suggest appropriate container configuration."""
+def detect_platform_and_suggest_container(force_refresh: bool = False):
+    """Detect platform and suggest appropriate container configuration.
+
+    The result is cached for the run; pass force_refresh=True to detect again.
+    """
+    if force_refresh:
+        _detect_platform_and_suggest_container.cache_clear()
+    return _detect_platform_and_suggest_container()
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_platform_and_suggest_container():
     system = platform.system().lower()
     
     if system == "darwin":  # macOS
         return "docker", "Docker recommended for macOS (Apptainer not supported)."
     elif system == "linux":
         # Check what's available - prefer what user has configured
-        docker_available = False
-        apptainer_available = False
-        
-        try:
-            subprocess.run(["docker", "--version"], capture_output=True, check=True)
-            docker_available = True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-            
-        try:
-            subprocess.run(["apptainer", "--version"], capture_output=True, check=True)
-            apptainer_available = True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+        # (a PATH lookup is enough, no need to start the runtime binaries)
+        docker_available = shutil.which("docker") is not None
+        apptainer_available = shutil.which("apptainer") is not None
         
         # HPC systems often only have Apptainer
         if apptainer_available and not docker_available:
@@ -170,11 +262,15 @@ def auto_select_container_config():
     elif detected_type == "apptainer":
         config_candidates = ["container_production.json", "container_apptainer.json", "container.json"]
     
+    detected_value = f'"{detected_type}"'.encode()
     for candidate in config_candidates:
-        if Path(candidate).exists():
+        if _path_exists(candidate):
             try:
-                with open(candidate, 'r') as f:
-                    config = json.load(f)
+                raw = Path(candidate).read_bytes()
+                # Byte check before parsing: a config that never mentions the type cannot match
+                if b'"container_type"' not in raw or detected_value not in raw:
+                    continue
+                config = _read_json(candidate, raw)
                 if config.get("container_type") == detected_type:
                     print(f"✅ Auto-selected container config: {candidate}")
                     return candidate
@@ -184,19 +280,52 @@ def auto_select_container_config():
     return None
 
 
+@dataclass(frozen=True)
+class RunContext:
+    """Values derived once per run and shared by every container invocation (and worker thread)"""
+    model_container_path: str  # Model file path as seen inside the container
+    container_options: List[str] = field(default_factory=list)  # Mounts/binds/env identical for every container
+    tmp_base: Optional[Path] = None  # WD/tmp, created once; each container gets its own subdirectory
+
+
+def build_run_context(config: Config, container_config: ContainerConfig, model_file_path: Path) -> RunContext:
+    """Resolve the model location and the static container options once for the whole run
+
+    The image is checked here, once, instead of for every container invocation.
+    """
+    check_container_image(container_config)
+    tmp_base = config.WD / "tmp"
+    tmp_base.mkdir(exist_ok=True)
+
+    model_container_path = get_container_model_path(model_file_path, config.DERIVATIVES_DIR)
+    model_mount = None
+    if not model_container_path.startswith("/derivatives/"):
+        # Model file is outside derivatives, mount it separately
+        model_mount = f"{model_file_path}:{model_container_path}"
+
+    if container_config.container_type == "apptainer":
+        container_options = build_apptainer_static_options(config, model_mount)
+    else:
+        container_options = build_docker_static_options(config, model_mount)
+
+    return RunContext(
+        model_container_path=model_container_path,
+        container_options=container_options,
+        tmp_base=tmp_base
+    )
+
+
 # ------------------------------
 # Logging & Utilities
 # ------------------------------
 
 def get_container_model_path(model_file_path: Path, derivatives_dir: Path) -> str:
     """Get the correct model file path within the container"""
-    try:
+    if model_file_path.is_relative_to(derivatives_dir):
         # If model file is inside derivatives directory, use relative path
-        relative_path = model_file_path.relative_to(derivatives_dir)
-        return f"/derivatives/{relative_path}"
-    except ValueError:
-        # Model file is outside derivatives, use mounted path
-        return "/models/smdl.json"
+        return f"/derivatives/{model_file_path.relative_to(derivatives_dir)}"
+    # Model file is outside derivatives, use mounted path
+    return "/models/smdl.json"
 
 
 def generate_log_filename(model_file_path: str) -> str:
@@ -206,9 +335,13 @@ def generate_log_filename(model_file_path: str) -> str:
     return f"{model_name}_{timestamp}.log"
 
 
-def log_debug(msg):
-    if DEBUG:
-        log(f"[DEBUG] {msg}")
+def log_debug(msg, *args):
+    """Log a debug message; `args` are %-formatted into `msg` only when DEBUG is on"""
+    if not DEBUG:
+        return
+    if args:
+        msg = msg % args
+    log(f"[DEBUG] {msg}")
 
 
 def log_error(msg):
@@ -216,56 +349,130 @@ def log_error(msg):
     sys.exit(1)
 
 
-def log(msg, error=False):
+def _get_log_fh():
+    """Return the open log file handle, reopening it if LOG_FILE has changed"""
+    global _LOG_FH
+    if _LOG_FH is None or _LOG_FH.name != LOG_FILE:
+        if _LOG_FH is not None:
+            _LOG_FH.close()
+        _LOG_FH = open(LOG_FILE, "a", buffering=1)  # Line-buffered: one write per message
+    return _LOG_FH
+
+
+def _close_log():
+    global _LOG_FH
+    if _LOG_FH is not None:
+        _LOG_FH.close()
+        _LOG_FH = None
+
+
+atexit.register(_close_log)
+
+
+def log(msg, error=False, console=True):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     full_msg = f"{timestamp} {msg}"
-    with open(LOG_FILE, "a") as f:
-        f.write(full_msg + "\n")
-    print(full_msg, file=sys.stderr if error else sys.stdout)
+    with _LOG_LOCK:
+        _get_log_fh().write(full_msg + "\n")
+        if console:
+            print(full_msg, file=sys.stderr if error else sys.stdout)
+
+
+def log_output(line):
+    """Log one line of container output.
+
+    Workers of run_subjects_parallel() send it to the log file only: their console
+    output is buffered until the unit finishes, and the full container output is
+    too large to hold in memory.
+    """
+    stdout = sys.stdout
+    log(line, console=not (isinstance(stdout, _ThreadBufferedStream) and stdout.is_buffering()))
+
+
+def _discover_subjects(fmriprep_dir: Path) -> List[str]:
+    """List subject labels (without 'sub-') found in the fMRIPrep derivatives.
+
+    Uses a single os.scandir pass; DirEntry.is_dir() answers from the directory
+    entry type, so no extra stat() is needed per subject (only symlinks are followed).
+    Names are filtered first, so fMRIPrep's sub-*.html reports and other files
+    are never type-checked (which costs a stat() where the type is unknown).
+    """
+    try:
+        with os.scandir(fmriprep_dir) as it:
+            return sorted(entry.name[4:] for entry in it
+                          if entry.name.startswith("sub-") and "." not in entry.name and entry.is_dir())
+    except OSError as e:
+        log_debug("Cannot list %s: %s", fmriprep_dir, e)
+        return []
+
+
+# BIDS entities needed from fMRIPrep filenames, all extracted in one findall() pass
+_BIDS_ENTITY_RE = re.compile(r'(?:^|_)(sub|task|space|desc)-([^_.]+)')
+
 
+def build_fmriprep_index(fmriprep_dir: Path) -> Dict[str, Dict[str, set]]:
+    """Index the preprocessed BOLD runs as {subject: {task: {space, ...}}}.
 
-def validate_space_availability(config: Config, subjects_to_process: List[str], task: str) -> bool:
+    The fMRIPrep derivatives are walked once (sub-*/[ses-*/]func/ only) so all
+    subject/task/space checks of a run are dictionary lookups. Every subject
+    directory gets an entry, even if it holds no BOLD files.
+    """
+    index = {}
+    for subject_label in _discover_subjects(fmriprep_dir):
+        prefix = f"sub-{subject_label}_"
+        tasks = index[subject_label] = {}
+        pending = [os.path.join(fmriprep_dir, f"sub-{subject_label}")]
+        while pending:
+            directory = pending.pop()
+            try:
+                it = os.scandir(directory)
+            except OSError as e:
+                # Unreadable (e.g. permissions on shared storage): skip it like a missing directory
+                log_debug("Skipping %s: %s", directory, e)
+                continue
+            with it:
+                for entry in it:
+                    name = entry.name
+                    # Name checks first: only func/ and ses-* entries need their type checked
+                    if name == "func" or name.startswith("ses-"):
+                        if entry.is_dir():
+                            pending.append(entry.path)
+                    elif name.endswith("_desc-preproc_bold.nii.gz") and name.startswith(prefix):
+                        entities = dict(_BIDS_ENTITY_RE.findall(name))
+                        if "task" in entities and "space" in entities:
+                            tasks.setdefault(entities["task"], set()).add(entities["space"])
+    return index
+
+
+def validate_space_availability(config: Config, subjects_to_process: List[str], task: str,
+                                fmriprep_index: Dict[str, Dict[str, set]]) -> bool:
     """Validate that the specified SPACE exists in fMRIPrep derivatives for the given subjects and task"""
-    log_debug(f"Validating SPACE '{config.SPACE}' for task '{task}'")
+    log_debug("Validating SPACE '%s' for task '%s'", config.SPACE, task)
     
     found_subjects = []
     missing_subjects = []
     available_spaces = set()
     
     for subject_label in subjects_to_process:
-        subject_dir = config.FMRIPREP_DIR / f"sub-{subject_label}"
-        if not subject_dir.is_dir():
+        subject_tasks = fmriprep_index.get(subject_label)
+        if subject_tasks is None:  # No subject directory in the fMRIPrep derivatives
             missing_subjects.append(subject_label)
             continue
             
-        # Look for BOLD files with the specified task
-        pattern = f"sub-{subject_label}_*task-{task}_*space-*_desc-preproc_bold.nii.gz"
-        bold_files = list(subject_dir.rglob(pattern))
-        
-        # Extract available spaces for this subject/task
-        subject_spaces = set()
-        space_found = False
-        
-        for bold_file in bold_files:
-            # Extract space from filename using regex
-            space_match = re.search(r'space-([^_]+)', bold_file.name)
-            if space_match:
-                space_name = space_match.group(1)
-                subject_spaces.add(space_name)
-                available_spaces.add(space_name)
-                
-                if space_name == config.SPACE:
-                    space_found = True
+        # Available spaces for this subject/task from its BOLD files
+        subject_spaces = subject_tasks.get(task, set())
+        available_spaces.update(subject_spaces)
         
-        if space_found:
+        if config.SPACE in subject_spaces:
             found_subjects.append(subject_label)
-            log_debug(f"Subject {subject_label}: SPACE '{config.SPACE}' found")
+            log_debug("Subject %s: SPACE '%s' found", subject_label, config.SPACE)
         else:
             missing_subjects.append(subject_label)
             if subject_spaces:
-                log_debug(f"Subject {subject_label}: SPACE '{config.SPACE}' NOT found. Available spaces: {sorted(subject_spaces)}")
+                log_debug("Subject %s: SPACE '%s' NOT found. Available spaces: %s",
+                          subject_label, config.SPACE, sorted(subject_spaces))
             else:
-                log_debug(f"Subject {subject_label}: No BOLD files found for task '{task}'")
+                log_debug("Subject %s: No BOLD files found for task '%s'", subject_label, task)
     
     # Report results
     if missing_subjects:
@@ -284,7 +491,9 @@ def validate_space_availability(config: Config, subjects_to_process: List[str],
     return True
 
 
+@functools.lru_cache(maxsize=None)
 def check_command(cmd):
+    """Exit if `cmd` is not on PATH; successful lookups are cached for the run"""
     if not shutil.which(cmd):
         log_error(f"'{cmd}' is required but not installed or in PATH.")
 
@@ -307,34 +516,95 @@ def check_docker_availability():
         log_error(f"Failed to check Docker status: {e}")
 
 
-def run_command(cmd_list, capture_output=False):
-    log_debug(f"Running command: {' '.join(cmd_list)}")
-    
-    try:
-        result = subprocess.run(cmd_list, check=True, text=True,
-                                stdout=subprocess.PIPE if capture_output else None,
-                                stderr=subprocess.STDOUT)
-        if capture_output:
-            log(result.stdout)
-        return True  # Success
-    except subprocess.CalledProcessError as e:
-        log_error_non_fatal(f"Command failed with exit code {e.returncode}: {' '.join(cmd_list)}")
-        if e.stdout:
-            log(f"Command output: {e.stdout}")
+def _stream_command(cmd_list, handle_line) -> int:
+    """Run a command, passing each line of its combined stdout/stderr to `handle_line`
+    as soon as it is produced. Returns the exit code."""
+    # errors="replace": a stray non-UTF-8 byte from MATLAB/Octave must not abort the stream
+    with subprocess.Popen(cmd_list, text=True, errors="replace", bufsize=1,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as proc:
+        for line in proc.stdout:
+            handle_line(line.rstrip("\n"))
+    return proc.returncode
+
+
+def run_command(cmd_list):
+    """Run a command, streaming its output into the log. Returns True on success."""
+    if DEBUG:  # Skip joining long command lines when debug output is off
+        log_debug("Running command: %s", shlex.join(cmd_list))
+
+    returncode = _stream_command(cmd_list, log_output)
+    if returncode != 0:
+        log_error_non_fatal(f"Command failed with exit code {returncode}: {' '.join(cmd_list)}")
         return False  # Failure
+    return True  # Success
+
+
+_BATCH_END_RE = re.compile(r'^===END (\S+) (\d+)===$')
+
+
+def build_batch_script(subject_args: Dict[str, List[str]]) -> str:
+    """Build a shell script running bidspm once per subject inside a single container.
+
+    Each subject's output is wrapped in ===BEGIN <label>=== / ===END <label> <rc>===
+    markers so per-subject exit codes can be recovered from the combined output.
+    """
+    lines = []
+    for subject_label, args in subject_args.items():
+        label = shlex.quote(subject_label)
+        lines.append(f"echo ===BEGIN {label}===")
+        lines.append(f"{CONTAINER_ENTRYPOINT} {' '.join(shlex.quote(a) for a in args)}")
+        lines.append(f"echo ===END {label} $?===")
+    return "\n".join(lines) + "\n"
+
+
+def run_batch_command(cmd_list, subject_labels: List[str]) -> List[str]:
+    """Run a batch script command and return the subjects whose step failed"""
+    if DEBUG:
+        log_debug(f"Running batch command for subjects: {', '.join(subject_labels)}")
+
+    exit_codes = {}
+
+    def handle_line(line):
+        log_output(line)
+        end_match = _BATCH_END_RE.match(line)
+        if end_match:
+            exit_codes[end_match.group(1)] = int(end_match.group(2))
+
+    returncode = _stream_command(cmd_list, handle_line)
+
+    if returncode != 0:
+        log_error_non_fatal(f"Batch command failed with exit code {returncode}")
+    # Subjects without an END marker did not finish (e.g. the container died)
+    return [label for label in subject_labels if exit_codes.get(label, 1) != 0]
+
+
+def validate_model(model_file_path: Path) -> bool:
+    """Validate the BIDS-StatsModel file in-process and log the validator output.
+
+    A failed validation is reported but does not stop the run.
+    """
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            validate_model_json(os.fspath(model_file_path))
+        success = True
+    except SystemExit as e:
+        success = not e.code
+    if output.getvalue():
+        log(output.getvalue().rstrip())
+    if not success:
+        log_error_non_fatal(f"BIDS-StatsModel validation failed for {model_file_path}")
+    return success
 
 
 def log_error_non_fatal(msg):
     """Log non-fatal error that doesn't stop execution"""
     print(f"⚠️  {msg}", file=sys.stderr)
 
-def setup_octave_compatibility(container_config: ContainerConfig):
-    """Setup Octave compatibility for older versions that lack 'contains' function"""
-    setup_script = '''
-    mkdir -p /tmp/octave_compat
-    
-    # Create compatibility function for 'contains' (missing in Octave < 7.0)
-    cat > /tmp/octave_compat/octaverc << 'EOF'
+OCTAVE_COMPAT_MOUNT = "/opt/octave_compat"  # Outside /tmp, which is bound per container run
+
+# Octave compatibility startup script, loaded via OCTAVE_SITE_INITFILE
+OCTAVE_COMPAT_RC = """\
 % Octave compatibility startup script for BIDSPM
 warning('off', 'all');
 
@@ -363,158 +633,293 @@ addpath('/home/neuro/bidspm/lib/CPP_ROI/atlas');
 addpath('/opt/spm12');
 
 fprintf('🔧 Octave compatibility loaded\\n');
-EOF
-    '''
-    
+"""
+
+
+def setup_octave_compatibility(config: Config, container_config: ContainerConfig):
+    """Setup Octave compatibility for older versions that lack 'contains' function
+
+    The startup script is written to WD/octave_compat/octaverc on the host and
+    bind-mounted into every Apptainer container, so no container has to be
+    started for the setup. The file is only rewritten when its content changed.
+    """
     try:
-        # Determine container path and command based on container type
         if container_config.container_type == "docker":
             # For docker, we would need different handling, but mainly using apptainer
             log_error_non_fatal("Octave compatibility setup not implemented for Docker containers")
             return False
-        elif container_config.container_type == "apptainer":
-            container_path = container_config.apptainer_image
-            cmd = ["apptainer", "exec", "--writable-tmpfs", container_path, "bash", "-c", setup_script]
-        else:
+        elif container_config.container_type != "apptainer":
             log_error_non_fatal(f"Unknown container type: {container_config.container_type}")
             return False
-        
-        # Set up compatibility in the container
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            log("✅ Octave compatibility setup successful")
+
+        compat_dir = config.WD / "octave_compat"
+        octaverc = compat_dir / "octaverc"
+        if octaverc.is_file() and octaverc.read_text(encoding="utf-8") == OCTAVE_COMPAT_RC:
+            log("✅ Octave compatibility already set up")
             return True
-        else:
-            log_error_non_fatal(f"Octave compatibility setup warning: {result.stderr}")
-            return False
+        compat_dir.mkdir(exist_ok=True)
+        octaverc.write_text(OCTAVE_COMPAT_RC, encoding="utf-8")
+        log("✅ Octave compatibility setup successful")
+        return True
     except Exception as e:
         log_error_non_fatal(f"Could not setup Octave compatibility: {e}")
         return False
 
 
-def build_container_command(container_config: ContainerConfig, config: Config, args: List[str], model_file_path: Path) -> tuple[List[str], str]:
-    """Build container command based on container type (docker or apptainer)
+def create_run_tmp_dir(tmp_base: Path) -> Path:
+    """Create a dedicated tmp directory for one container run below the run's tmp base"""
+    run_tmp_dir = tmp_base / f"run_{_RUN_STAMP}_{next(_RUN_SEQ):04d}"
+    run_tmp_dir.mkdir(exist_ok=True)  # tmp_base exists, so a single mkdir() is enough
+    return run_tmp_dir
+
+
+def build_docker_run_options(context: RunContext, run_tmp_dir: Optional[str] = None) -> List[str]:
+    """Build the options for one Docker container: the static options plus a fresh tmp mount"""
+    if run_tmp_dir is None:
+        run_tmp_dir = create_run_tmp_dir(context.tmp_base)
+    return [*context.container_options, "-v", f"{run_tmp_dir}:/tmp"]
+
+
+def build_apptainer_options(context: RunContext, run_tmp_dir: Optional[str] = None) -> List[str]:
+    """Build the options for one Apptainer container: the static options plus a fresh tmp bind"""
+    if run_tmp_dir is None:
+        run_tmp_dir = create_run_tmp_dir(context.tmp_base)
+    return [*context.container_options, "--bind", f"{run_tmp_dir}:/tmp"]
+
+
+def build_docker_static_options(config: Config, model_mount: Optional[str]) -> List[str]:
+    """Build the mount and environment options shared by every Docker container of a run"""
+    options = [
+        "-v", f"{config.BIDS_DIR}:/raw:ro",  # Raw data is input only
+        "-v", f"{config.DERIVATIVES_DIR}:/derivatives"
+    ]
+
+    # Model files inside derivatives are already visible - no additional volume mount needed
+    if model_mount:
+        options.extend(["-v", model_mount])
+
+    # Set environment variables for better container isolation
+    options.extend([
+        "-e", "HOME=/tmp",
+        "-e", "TMPDIR=/tmp",
+        "-e", "TMP=/tmp",
+        "-e", "SPM_HTML_BROWSER=0",   # Disable SPM browser for headless operation
+        "-e", "BIDSPM_IGNORE_FIELDMAPS=1",  # Skip fieldmap processing (not needed for smoothing)
+        "-e", "BIDSPM_IGNORE_FIGURES=1",   # Skip HTML/SVG files processing
+        "-e", "BIDSPM_SKIP_INTENDEDFOR_CHECK=1"  # Skip IntendedFor validation (irrelevant post-fMRIPrep)
+    ])
+    return options
+
+
+def build_apptainer_static_options(config: Config, model_mount: Optional[str]) -> List[str]:
+    """Build the isolation, bind and environment options shared by every Apptainer container of a run"""
+    options = [
+        "--containall",  # Isolate container environment
+        "--writable-tmpfs",  # Allow writing to /tmp and other temp locations
+        "--cleanenv",  # Start with clean environment
+        "--bind", f"{config.BIDS_DIR}:/raw:ro",  # Raw data is input only
+        "--bind", f"{config.DERIVATIVES_DIR}:/derivatives"
+    ]
     
-    Returns:
-        tuple: (container_command, model_file_container_path)
-    """
+    # Model files inside derivatives are already visible - no additional bind needed
+    if model_mount:
+        options.extend(["--bind", model_mount])
+    
+    # Add additional bind mounts for writable directories to solve "Read-only file system" issues
+    atlas_dir = config.WD / "atlas"
+    cpp_roi_atlas_dir = config.WD / "cpp_roi_atlas"
+    error_logs_dir = config.WD / "error_logs"
+    spm_dir = config.WD / "spm"
+    matlab_cache_dir = config.WD / "matlab_cache"
+    
+    # Create directories if they don't exist (one scandir of WD, mkdir only for missing ones)
+    for missing_dir in _find_missing_dirs([atlas_dir, cpp_roi_atlas_dir, error_logs_dir, spm_dir, matlab_cache_dir]):
+        missing_dir.mkdir(exist_ok=True)
     
+    options.extend([
+        "--bind", f"{atlas_dir}:/opt/spm12/atlas",
+        "--bind", f"{cpp_roi_atlas_dir}:/home/neuro/bidspm/lib/CPP_ROI/atlas",
+        "--bind", f"{error_logs_dir}:/home/neuro/bidspm/error_logs",
+        "--bind", f"{spm_dir}:/home/neuro/spm",  # SPM working directory
+        "--bind", f"{matlab_cache_dir}:/home/neuro/.matlab"  # MATLAB cache
+    ])
+
+    # Octave compatibility script written by setup_octave_compatibility()
+    octave_compat_dir = config.WD / "octave_compat"
+    if octave_compat_dir.is_dir():
+        options.extend(["--bind", f"{octave_compat_dir}:{OCTAVE_COMPAT_MOUNT}:ro"])
+    
+    # Set important environment variables for the container
+    options.extend([
+        "--env", "HOME=/tmp",  # Set HOME to tmp directory
+        "--env", "TMPDIR=/tmp",  # Set TMPDIR
+        "--env", "TMP=/tmp",     # Set TMP
+        "--env", "MATLAB_LOG_DIR=/tmp",  # MATLAB logs to tmp
+        "--env", "SPM_HTML_BROWSER=0",   # Disable SPM browser for headless operation
+        "--env", "BIDSPM_SKIP_ATLAS_INIT=1",  # Try to skip problematic atlas initialization
+        "--env", "OCTAVE_EXECUTABLE=/usr/bin/octave",  # Ensure Octave path
+        "--env", "MATLABPATH=/home/neuro/bidspm:/home/neuro/bidspm/lib/CPP_ROI:/home/neuro/bidspm/lib/CPP_ROI/atlas:/opt/spm12",  # Explicit MATLAB path with atlas directory
+        "--env", "CPP_ROI_SKIP_ATLAS=1",  # Skip CPP_ROI atlas operations if supported
+        "--env", "OCTAVE_INIT_FILE=/tmp/octave_init.m",  # Custom Octave initialization to force atlas path
+        "--env", f"OCTAVE_SITE_INITFILE={OCTAVE_COMPAT_MOUNT}/octaverc",  # Octave compatibility startup script
+        "--env", "BIDSPM_IGNORE_FIELDMAPS=1",  # Skip fieldmap processing (not needed for smoothing)
+        "--env", "BIDSPM_IGNORE_FIGURES=1",   # Skip HTML/SVG files processing
+        "--env", "BIDSPM_SKIP_INTENDEDFOR_CHECK=1"  # Skip IntendedFor validation (irrelevant post-fMRIPrep)
+    ])
+    return options
+
+
+def check_container_image(container_config: ContainerConfig):
+    """Make sure the configured image for the selected container type is usable"""
     if container_config.container_type == "docker":
         if not container_config.docker_image:
             log_error("Docker image not specified in container configuration.")
-        
-        cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{config.BIDS_DIR}:/raw",
-            "-v", f"{config.DERIVATIVES_DIR}:/derivatives"
-        ]
-        
-        # Create and mount a dedicated tmp directory for this run
-        run_tmp_dir = config.WD / "tmp" / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
-        run_tmp_dir.mkdir(parents=True, exist_ok=True)
-        cmd.extend(["-v", f"{run_tmp_dir}:/tmp"])
-        
-        # Check if model file is inside derivatives directory
-        try:
-            rel_path = model_file_path.relative_to(config.DERIVATIVES_DIR)
-            # Model file is inside derivatives, use relative path - no additional volume mount needed
-            model_container_path = f"/derivatives/{rel_path}"
-        except ValueError:
-            # Model file is outside derivatives, mount it separately
-            cmd.extend(["-v", f"{model_file_path}:/models/smdl.json"])
-            model_container_path = "/models/smdl.json"
-        
-        # Set environment variables for better container isolation
-        cmd.extend([
-            "-e", "HOME=/tmp",
-            "-e", "TMPDIR=/tmp",
-            "-e", "TMP=/tmp",
-            "-e", "SPM_HTML_BROWSER=0",   # Disable SPM browser for headless operation
-            "-e", "BIDSPM_IGNORE_FIELDMAPS=1",  # Skip fieldmap processing (not needed for smoothing)
-            "-e", "BIDSPM_IGNORE_FIGURES=1",   # Skip HTML/SVG files processing
-            "-e", "BIDSPM_SKIP_INTENDEDFOR_CHECK=1"  # Skip IntendedFor validation (irrelevant post-fMRIPrep)
-        ])
-
-        cmd.append(container_config.docker_image)
-        cmd.extend(args)
-        return cmd, model_container_path
-    
     elif container_config.container_type == "apptainer":
         if not container_config.apptainer_image:
             log_error("Apptainer image not specified in container configuration.")
-        
+
         # Check if it's a docker:// URL or local .sif file
         if not container_config.apptainer_image.startswith("docker://") and not Path(container_config.apptainer_image).exists():
             log_error(f"Apptainer image file '{container_config.apptainer_image}' not found.")
-        
-        cmd = [
-            "apptainer", "run",
-            "--containall",  # Isolate container environment
-            "--writable-tmpfs",  # Allow writing to /tmp and other temp locations
-            "--cleanenv",  # Start with clean environment
-            "--bind", f"{config.BIDS_DIR}:/raw",
-            "--bind", f"{config.DERIVATIVES_DIR}:/derivatives"
-        ]
-        
-        # Check if model file is inside derivatives directory
-        try:
-            rel_path = model_file_path.relative_to(config.DERIVATIVES_DIR)
-            # Model file is inside derivatives, use relative path - no additional bind needed
-            model_container_path = f"/derivatives/{rel_path}"
-        except ValueError:
-            # Model file is outside derivatives, mount it separately
-            cmd.extend(["--bind", f"{model_file_path}:/models/smdl.json"])
-            model_container_path = "/models/smdl.json"
-        
-        # Create and mount a dedicated tmp directory for this run
-        run_tmp_dir = config.WD / "tmp" / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
-        run_tmp_dir.mkdir(parents=True, exist_ok=True)
-        cmd.extend(["--bind", f"{run_tmp_dir}:/tmp"])
-        
-        # Add additional bind mounts for writable directories to solve "Read-only file system" issues
-        atlas_dir = config.WD / "atlas"
-        cpp_roi_atlas_dir = config.WD / "cpp_roi_atlas"
-        error_logs_dir = config.WD / "error_logs"
-        spm_dir = config.WD / "spm"
-        matlab_cache_dir = config.WD / "matlab_cache"
-        
-        # Create directories if they don't exist
-        atlas_dir.mkdir(exist_ok=True)
-        cpp_roi_atlas_dir.mkdir(exist_ok=True)
-        error_logs_dir.mkdir(exist_ok=True)
-        spm_dir.mkdir(exist_ok=True)
-        matlab_cache_dir.mkdir(exist_ok=True)
-        
-        cmd.extend([
-            "--bind", f"{atlas_dir}:/opt/spm12/atlas",
-            "--bind", f"{cpp_roi_atlas_dir}:/home/neuro/bidspm/lib/CPP_ROI/atlas",
-            "--bind", f"{error_logs_dir}:/home/neuro/bidspm/error_logs",
-            "--bind", f"{spm_dir}:/home/neuro/spm",  # SPM working directory
-            "--bind", f"{matlab_cache_dir}:/home/neuro/.matlab"  # MATLAB cache
-        ])
-        
-        # Set important environment variables for the container
-        cmd.extend([
-            "--env", "HOME=/tmp",  # Set HOME to tmp directory
-            "--env", "TMPDIR=/tmp",  # Set TMPDIR
-            "--env", "TMP=/tmp",     # Set TMP
-            "--env", "MATLAB_LOG_DIR=/tmp",  # MATLAB logs to tmp
-            "--env", "SPM_HTML_BROWSER=0",   # Disable SPM browser for headless operation
-            "--env", "BIDSPM_SKIP_ATLAS_INIT=1",  # Try to skip problematic atlas initialization
-            "--env", "OCTAVE_EXECUTABLE=/usr/bin/octave",  # Ensure Octave path
-            "--env", "MATLABPATH=/home/neuro/bidspm:/home/neuro/bidspm/lib/CPP_ROI:/home/neuro/bidspm/lib/CPP_ROI/atlas:/opt/spm12",  # Explicit MATLAB path with atlas directory
-            "--env", "CPP_ROI_SKIP_ATLAS=1",  # Skip CPP_ROI atlas operations if supported
-            "--env", "OCTAVE_INIT_FILE=/tmp/octave_init.m",  # Custom Octave initialization to force atlas path
-            "--env", "OCTAVE_SITE_INITFILE=/tmp/octave_compat/octaverc",  # Octave compatibility startup script
-            "--env", "BIDSPM_IGNORE_FIELDMAPS=1",  # Skip fieldmap processing (not needed for smoothing)
-            "--env", "BIDSPM_IGNORE_FIGURES=1",   # Skip HTML/SVG files processing
-            "--env", "BIDSPM_SKIP_INTENDEDFOR_CHECK=1"  # Skip IntendedFor validation (irrelevant post-fMRIPrep)
-        ])
 
+
+class ContainerSession:
+    """Long-lived container reused for every invocation of a run.
+
+    Instead of paying a cold container start per subject, task and step, one
+    container is started in the background on enter and each invocation is
+    dispatched into it: a `docker run -d` container driven with `docker exec`, or
+    an Apptainer instance driven with `apptainer run/exec instance://`. Mounts and
+    environment are fixed for the whole session. The container is removed on exit,
+    at interpreter exit and on SIGTERM so a crashed run does not leave orphan
+    containers behind.
+    """
+
+    def __init__(self, container_config: ContainerConfig, context: RunContext):
+        self.container_config = container_config
+        self.context = context
+        self.name = f"bidspm-{os.getpid()}"
+        self.cid = None
+        self.tmp_dir: Optional[Path] = None  # Host directory mounted at /tmp in the session
+        self.entrypoint: List[str] = []
+        self._previous_sigterm = None
+
+    def __enter__(self):
+        if self.container_config.container_type == "docker":
+            self._start_docker()
+        else:
+            self._start_apptainer()
+
+        atexit.register(self.close)
+        self._previous_sigterm = signal.signal(signal.SIGTERM, self._handle_sigterm)
+        return self
+
+    def _start_docker(self):
+        image = self.container_config.docker_image
+        self.tmp_dir = create_run_tmp_dir(self.context.tmp_base)
+        options = build_docker_run_options(self.context, str(self.tmp_dir))
+        cmd = ["docker", "run", "-d", "--rm", "--name", self.name, "--entrypoint", "sleep",
+               *options, image, "infinity"]
+        if DEBUG:
+            log_debug("Starting container session: %s", shlex.join(cmd))
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            log_error(f"Could not start container session: {result.stderr.strip()}")
+        self.cid = result.stdout.strip()
+        log(f"🐳 Started container session {self.name} ({self.cid[:12]})")
+
+        # The image entrypoint (bidspm) is replaced by sleep, so remember it for docker exec.
+        # Inspected only now: docker run has pulled the image if it was not available locally.
+        result = subprocess.run(["docker", "inspect", "--format", "{{json .Config.Entrypoint}}", image],
+                                capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.strip() not in ("", "null"):
+            self.entrypoint = json.loads(result.stdout)
+        else:
+            log_debug("Could not read the entrypoint of %s, using '%s'", image, CONTAINER_ENTRYPOINT)
+            self.entrypoint = [CONTAINER_ENTRYPOINT]
+
+    def _start_apptainer(self):
+        self.tmp_dir = create_run_tmp_dir(self.context.tmp_base)
+        options = build_apptainer_options(self.context, str(self.tmp_dir))
+        cmd = ["apptainer", "instance", "start", *options, self.container_config.apptainer_image, self.name]
+        if DEBUG:
+            log_debug("Starting container session: %s", shlex.join(cmd))
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            log_error(f"Could not start Apptainer instance: {result.stderr.strip()}")
+        self.cid = self.name
+        log(f"📦 Started Apptainer instance {self.name}")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        atexit.unregister(self.close)
+        if self._previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, self._previous_sigterm)
+        return False
+
+    def _handle_sigterm(self, signum, frame):
+        self.close()
+        sys.exit(128 + signum)
+
+    def exec_command(self, args: List[str], entrypoint: Optional[str] = None) -> List[str]:
+        """Wrap container arguments into a call that runs inside this session"""
+        if self.container_config.container_type == "apptainer":
+            if entrypoint:
+                return ["apptainer", "exec", f"instance://{self.name}", entrypoint, *args]
+            # run executes the image runscript (bidspm) inside the instance
+            return ["apptainer", "run", f"instance://{self.name}", *args]
+        program = [entrypoint] if entrypoint else self.entrypoint
+        return ["docker", "exec", self.cid, *program, *args]
+
+    def close(self):
+        """Remove the session container (safe to call more than once)"""
+        if self.cid is None:
+            return
+        cid, self.cid = self.cid, None
+        if self.container_config.container_type == "apptainer":
+            subprocess.run(["apptainer", "instance", "stop", cid], capture_output=True)
+        else:
+            subprocess.run(["docker", "rm", "-f", cid], capture_output=True)
+        log_debug(f"Stopped container session {self.name}")
+
+
+def build_container_command(container_config: ContainerConfig, args: List[str], context: RunContext,
+                            session: Optional[ContainerSession] = None,
+                            entrypoint: Optional[str] = None, run_tmp_dir: Optional[str] = None) -> List[str]:
+    """Build container command based on container type (docker or apptainer)
+
+    Only the tmp mount and the arguments change per call; the image check and the
+    static mounts/env options were done once in build_run_context().
+
+    If a running ContainerSession is given, the command is dispatched into it instead
+    of starting a new container. `entrypoint` runs another program than the image
+    default (e.g. "bash" for batch scripts). `run_tmp_dir` mounts a given tmp directory
+    instead of creating one (used for Slurm job scripts, which create it at run time).
+    """
+    
+    if container_config.container_type == "docker":
+        if session is not None:
+            return session.exec_command(args, entrypoint)
+
+        options = build_docker_run_options(context, run_tmp_dir)
+        cmd = ["docker", "run", "--rm", *options]
+        if entrypoint:
+            cmd.extend(["--entrypoint", entrypoint])
+        cmd.append(container_config.docker_image)
+        cmd.extend(args)
+        return cmd
+    
+    elif container_config.container_type == "apptainer":
+        if session is not None:
+            return session.exec_command(args, entrypoint)
+
+        options = build_apptainer_options(context, run_tmp_dir)
+        cmd = ["apptainer", "exec" if entrypoint else "run", *options]
         cmd.append(container_config.apptainer_image)
+        if entrypoint:
+            cmd.append(entrypoint)
         cmd.extend(args)
-        return cmd, model_container_path
+        return cmd
     
     else:
         log_error(f"Unsupported container type: {container_config.container_type}")
@@ -546,6 +951,15 @@ def ensure_derivatives_dataset_description(derivatives_dir: Path):
             log_debug(f"Could not create dataset_description.json: {e}")
 
 
+def _remove_tmp_dir(tmp_dir: str):
+    """Remove one tmp directory; returns the error instead of raising (used from a thread pool)"""
+    try:
+        shutil.rmtree(tmp_dir)
+        return None
+    except Exception as e:
+        return e
+
+
 def cleanup_tmp_directories(config: Config, max_age_hours: int = 24):
     """Clean up old temporary directories to prevent disk space issues."""
     try:
@@ -553,20 +967,25 @@ def cleanup_tmp_directories(config: Config, max_age_hours: int = 24):
         if not tmp_base_dir.exists():
             return
         
-        current_time = datetime.now()
-        removed_count = 0
+        cutoff = time.time() - max_age_hours * 3600
         
-        for tmp_dir in tmp_base_dir.iterdir():
-            if tmp_dir.is_dir() and tmp_dir.name.startswith("run_"):
-                # Check age of directory
-                dir_age = current_time - datetime.fromtimestamp(tmp_dir.stat().st_mtime)
-                if dir_age.total_seconds() > (max_age_hours * 3600):
-                    try:
-                        shutil.rmtree(tmp_dir)
-                        removed_count += 1
-                        log_debug(f"Cleaned up old tmp directory: {tmp_dir}")
-                    except Exception as e:
-                        log_debug(f"Could not clean up tmp directory {tmp_dir}: {e}")
+        # DirEntry caches the entry type, so only run_* directories are stat()ed for their age
+        with os.scandir(tmp_base_dir) as it:
+            old_dirs = [entry.path for entry in it
+                        if entry.name.startswith("run_") and entry.is_dir(follow_symlinks=False)
+                        and entry.stat(follow_symlinks=False).st_mtime < cutoff]
+        if not old_dirs:
+            return
+        
+        # rmtree is I/O-bound, so a few directories are removed concurrently
+        removed_count = 0
+        with ThreadPoolExecutor(max_workers=min(8, len(old_dirs))) as executor:
+            for tmp_dir, error in zip(old_dirs, executor.map(_remove_tmp_dir, old_dirs)):
+                if error is None:
+                    removed_count += 1
+                    log_debug("Cleaned up old tmp directory: %s", tmp_dir)
+                else:
+                    log_debug("Could not clean up tmp directory %s: %s", tmp_dir, error)
         
         if removed_count > 0:
             print(f"🧹 Cleaned up {removed_count} old temporary directories")
@@ -596,6 +1015,14 @@ OPTIONS:
     --pilot                       Pilot mode: process only one random subject for testing
     --skip-modelvalidation        Skip BIDS-StatsModel JSON validation
     --action                      Actions to perform: smooth, stats, dataset (at least one required)
+    -j, --jobs N                  Number of subjects to process in parallel (default: 1, 0 = half the CPU cores)
+        --max-parallel-subjects N Same as --jobs
+    --reuse-container             Reuse one long-lived container/instance for all steps (requires --jobs 1)
+    --bundle-size N               Pass up to N subjects to one bidspm call per step (default: 1)
+    --batch-subjects              Run each step for all subjects of a task in one container
+    --scheduler local|slurm       Run containers locally (default) or submit one Slurm array job per task
+    --array-limit N               With --scheduler slurm: at most N array tasks at once (default: no limit)
+    --wait                        With --scheduler slurm: wait for the submitted jobs, report failed ones (sacct)
 
 DESCRIPTION:
     BIDSPM Runner executes neuroimaging analysis pipelines using containerized 
@@ -644,11 +1071,12 @@ WORKFLOW:
     3. For each subject and task:
        - Performs smoothing if selected via --action smooth
        - Runs statistical analysis if selected via --action stats
+       - Subjects are processed in parallel when --jobs > 1
     4. Runs dataset-level analysis if selected via --action dataset
     5. Logs all activities to timestamped log file
 
 REQUIREMENTS:
-    - Python 3.8+
+    - Python 3.9+
     - Docker or Apptainer
     - BIDS-compliant dataset
     - Preprocessed fMRI data (e.g., from fMRIPrep)
@@ -666,6 +1094,12 @@ EXAMPLES:
     
     # Pilot mode: test with one random subject
     python bidspm.py -s config.json -c container.json --pilot --action stats
+
+    # Process 4 subjects in parallel
+    python bidspm.py -s config.json -c container.json --jobs 4 --action smooth stats
+
+    # Submit one Slurm array job per task (at most 20 subjects at once), dataset stats afterwards
+    python bidspm.py -s config.json -c container.json --scheduler slurm --array-limit 20 --action smooth stats dataset
     
     # Run with all custom files
     python bidspm.py -s study_config.json -c docker_setup.json -m models/task_model.json --action smooth stats dataset
@@ -688,6 +1122,19 @@ MORE INFORMATION:
     print(help_text)
 
 
+def _int_at_least(minimum: int):
+    """argparse type for integers >= minimum"""
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {number}")
+        return number
+    return parse
+
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(
@@ -708,9 +1155,624 @@ def parse_arguments():
                        help='Skip BIDS-StatsModel JSON validation')
     parser.add_argument('--action', nargs='+', choices=['smooth', 'stats', 'dataset'], required=True,
                        help='Actions to perform: smooth, stats, dataset (at least one required)')
+    parser.add_argument('-j', '--jobs', '--max-parallel-subjects', type=_int_at_least(0), default=1,
+                       help='Number of subjects to process in parallel (default: 1, 0 = half the CPU cores)')
+    parser.add_argument('--reuse-container', action='store_true',
+                       help='Start one long-lived container (Docker) or instance (Apptainer) and run each step in it')
+    parser.add_argument('--bundle-size', type=_int_at_least(1), default=1, metavar='N',
+                       help='Pass up to N subjects to one bidspm call per step (default: 1)')
+    parser.add_argument('--batch-subjects', action='store_true',
+                       help='Run smoothing/stats for all subjects of a task in a single container invocation')
+    parser.add_argument('--scheduler', choices=['local', 'slurm'], default='local',
+                       help='Run containers locally (default) or submit them as Slurm array jobs')
+    parser.add_argument('--array-limit', type=_int_at_least(1), metavar='N',
+                       help='With --scheduler slurm: run at most N array tasks at once (default: no limit)')
+    parser.add_argument('--wait', action='store_true',
+                       help='With --scheduler slurm: wait until the submitted jobs have finished and report failed ones')
     return parser.parse_args()
 
 
+# ------------------------------
+# Subject Processing
+# ------------------------------
+
+def build_smooth_args(config: Config, task: str, subject_labels: List[str]) -> List[str]:
+    """Container arguments for subject-level smoothing of one or more subjects"""
+    # For smoothing, use the original fMRIPrep directory, not bidspm-preproc
+    return [
+        "/derivatives/fmriprep", "/derivatives", "subject", "smooth",
+        "--participant_label", *subject_labels,
+        "--task", task,
+        "--space", config.SPACE,
+        "--fwhm", config.FWHM_STR,
+        "--verbosity", str(max(0, config.VERBOSITY - 1))  # Reduce verbosity to minimize warnings
+    ]
+
+
+def build_stats_args(config: Config, task: str, subject_labels: List[str], model_container_path: str) -> List[str]:
+    """Container arguments for subject-level stats of one or more subjects"""
+    return [
+        "/raw", "/derivatives", "subject", "stats",
+        "--preproc_dir", "/derivatives/bidspm-preproc",
+        "--model_file", model_container_path,
+        "--participant_label", *subject_labels,
+        "--task", task,
+        "--space", config.SPACE,
+        "--fwhm", config.FWHM_STR,
+        "--verbosity", str(config.VERBOSITY)
+    ]
+
+
+def build_dataset_args(config: Config, task: str, model_container_path: str) -> List[str]:
+    """Container arguments for dataset-level stats of one task"""
+    return [
+        "/raw", "/derivatives", "dataset", "stats",
+        "--preproc_dir", "/derivatives/bidspm-preproc",
+        "--model_file", model_container_path,
+        "--task", task,
+        "--space", config.SPACE,
+        "--fwhm", config.FWHM_STR,
+        "--verbosity", str(config.VERBOSITY)
+    ]
+
+
+def has_smoothed_data(config: Config, subject_label: str, space: str) -> bool:
+    """Check bidspm-preproc for smoothed data of a subject in the given space"""
+    preproc_dir = config.DERIVATIVES_DIR / "bidspm-preproc"
+    # No separate exists() check: a missing subject directory just makes the glob empty
+    for ses_dir in preproc_dir.glob(f"sub-{subject_label}/ses-*/func"):
+        if any(ses_dir.glob(f"*_space-{space}*.nii*")):
+            return True
+    return False
+
+
+def process_subject(args, config: Config, container_config: ContainerConfig, context: RunContext, task: str, subject_label: str,
+                    session: Optional[ContainerSession] = None):
+    """Run the selected subject-level steps (ROI, smoothing, stats) for one subject and task.
+
+    Steps for a single subject are run in order, so smoothing always finishes before stats.
+    Different subjects are independent and may be processed concurrently (see --jobs).
+    """
+    # The subject directory is known to exist: validate_space_availability() checked it
+    log_debug("Processing subject: %s, task: %s", subject_label, task)
+
+
+    # ROI analysis block
+    if hasattr(config, "ROI") and config.ROI:
+        roi_config = config.ROI_CONFIG
+        preproc_dir = config.DERIVATIVES_DIR / "bidspm-preproc"
+        
+        # Check if preproc directory exists
+        if not preproc_dir.exists():
+            print(f"❌ Preprocessing directory not found: {preproc_dir}")
+            print("   ROI analysis requires smoothed data. Please run smoothing first using the --action smooth option.")
+            return
+        
+        # Check for smoothed data for each required space
+        missing_spaces = [roi_space for roi_space in roi_config["space"]
+                          if not has_smoothed_data(config, subject_label, roi_space)]
+        if missing_spaces:
+            print(f"❌ Smoothed data for ROI space(s) {missing_spaces} not found in {preproc_dir}.")
+            print(f"   Please run smoothing for space(s) {missing_spaces} first using the --action smooth option and update 'SPACE' in config if needed.")
+            return
+
+        # Create ROI
+        roi_args = [
+            "/raw", "/derivatives", "subject", "create_roi",
+            "--participant_label", subject_label,
+            "--preproc_dir", "/derivatives/bidspm-preproc",
+            "--roi_atlas", roi_config["roi_atlas"],
+            "--roi_name"
+        ]
+        # Add each ROI name as a separate argument
+        roi_args.extend(roi_config["roi_name"])
+        roi_args.extend(["--space", ",".join(roi_config["space"])])
+        cmd = build_container_command(container_config, roi_args, context, session)
+        success = run_command(cmd)
+        if not success:
+            print(f"⚠️  ROI creation failed for subject {subject_label}, task {task}.")
+            return
+
+        # Run ROI-based GLM
+        # roi_dir wird nicht mehr benötigt
+        stats_args = [
+            "/raw", "/derivatives", "subject", "stats",
+            "--participant_label", subject_label,
+            "--preproc_dir", "/derivatives/bidspm-preproc",
+            "--model_file", context.model_container_path,
+            "--roi_based",
+            "--roi_name"
+        ]
+        # Add each ROI name as a separate argument  
+        stats_args.extend(roi_config["roi_name"])
+        stats_args.extend([
+            "--roi_dir", "/derivatives/bidspm-roi",
+            "--space", ",".join(roi_config["space"]),
+            "--fwhm", "0"
+        ])
+        cmd = build_container_command(container_config, stats_args, context, session)
+        success = run_command(cmd)
+        if not success:
+            print(f"⚠️  ROI stats failed for subject {subject_label}, task {task}.")
+        else:
+            print(f"✅ ROI stats completed for subject {subject_label}, task {task}")
+
+    if 'smooth' in args.action:
+        print(f">>> Smoothing for subject: {subject_label}, task: {task}")
+        smooth_args = build_smooth_args(config, task, [subject_label])
+        cmd = build_container_command(container_config, smooth_args, context, session)
+        success = run_command(cmd)
+        if not success:
+            print(f"⚠️  Smoothing failed for subject {subject_label}, task {task}. Continuing with next step.")
+            log_error_non_fatal(f"Smoothing failed for subject {subject_label}, task {task}")
+    else:
+        print(f"✅ Smoothing completed for subject {subject_label}, task {task}")
+
+    if 'stats' in args.action:
+        # Checked after smoothing, so --action smooth stats works on fresh data
+        if not has_smoothed_data(config, subject_label, config.SPACE):
+            print(f"❌ Smoothed data for main SPACE '{config.SPACE}' not found in {config.DERIVATIVES_DIR / 'bidspm-preproc'}. Run smoothing first!")
+            return
+        print(f">>> Running stats for subject: {subject_label}, task: {task}")
+        stats_args = build_stats_args(config, task, [subject_label], context.model_container_path)
+        cmd = build_container_command(container_config, stats_args, context, session)
+        success = run_command(cmd)
+        if not success:
+            print(f"⚠️  Stats failed for subject {subject_label}, task {task}. Continuing with next step.")
+            log_error_non_fatal(f"Stats failed for subject {subject_label}, task {task}")
+    else:
+        print(f"✅ Stats completed for subject {subject_label}, task {task}")
+
+
+def run_batch_step(container_config: ContainerConfig, config: Config, context: RunContext,
+                   subject_args: Dict[str, List[str]], session: Optional[ContainerSession] = None) -> List[str]:
+    """Run one step for several subjects in one container and return the subjects whose step failed.
+
+    The script is written to the container's tmp directory on the host (mounted at /tmp)
+    and run as a file, so its size is not limited by the maximum length of one argument.
+    """
+    run_tmp_dir = session.tmp_dir if session is not None else create_run_tmp_dir(context.tmp_base)
+    script_name = f"batch_{next(_RUN_SEQ):04d}.sh"
+    (run_tmp_dir / script_name).write_text(build_batch_script(subject_args))
+    cmd = build_container_command(container_config, [f"/tmp/{script_name}"], context, session,
+                                  entrypoint="bash", run_tmp_dir=str(run_tmp_dir))
+    return run_batch_command(cmd, list(subject_args))
+
+
+def process_subjects_batched(args, config: Config, container_config: ContainerConfig, context: RunContext, task: str,
+                             subjects_to_process: List[str], session: Optional[ContainerSession] = None):
+    """Run smoothing and stats for all subjects of a task with one container invocation per step.
+
+    A generated shell script loops over the subjects inside the container, so the
+    container start-up cost is paid once per step instead of once per subject.
+    """
+    # Subject directories are known to exist: validate_space_availability() checked them
+    subjects = list(subjects_to_process)
+    if not subjects:
+        return
+
+    if 'smooth' in args.action:
+        print(f">>> Smoothing {len(subjects)} subjects in one container, task: {task}")
+        failed = run_batch_step(container_config, config, context,
+                                {s: build_smooth_args(config, task, [s]) for s in subjects}, session)
+        for subject_label in subjects:
+            if subject_label in failed:
+                print(f"⚠️  Smoothing failed for subject {subject_label}, task {task}. Continuing with next step.")
+                log_error_non_fatal(f"Smoothing failed for subject {subject_label}, task {task}")
+            else:
+                print(f"✅ Smoothing completed for subject {subject_label}, task {task}")
+
+    if 'stats' in args.action:
+        ready = []
+        for subject_label in subjects:
+            if has_smoothed_data(config, subject_label, config.SPACE):
+                ready.append(subject_label)
+            else:
+                print(f"❌ Smoothed data for main SPACE '{config.SPACE}' not found for subject {subject_label}. Run smoothing first!")
+        if not ready:
+            return
+
+        print(f">>> Running stats for {len(ready)} subjects in one container, task: {task}")
+        failed = run_batch_step(container_config, config, context,
+                                {s: build_stats_args(config, task, [s], context.model_container_path) for s in ready},
+                                session)
+        for subject_label in ready:
+            if subject_label in failed:
+                print(f"⚠️  Stats failed for subject {subject_label}, task {task}. Continuing with next step.")
+                log_error_non_fatal(f"Stats failed for subject {subject_label}, task {task}")
+            else:
+                print(f"✅ Stats completed for subject {subject_label}, task {task}")
+
+
+def process_subject_bundle(args, config: Config, container_config: ContainerConfig, context: RunContext, task: str,
+                           bundle: List[str], session: Optional[ContainerSession] = None):
+    """Run smoothing and stats for a bundle of subjects, passing all labels to one bidspm call per step.
+
+    bidspm processes the bundle in a single container (one MATLAB/Octave start-up).
+    A failed call is reported for every subject of the bundle, since the exit code
+    cannot be attributed to a single subject.
+    """
+    labels = ", ".join(bundle)
+    if 'smooth' in args.action:
+        print(f">>> Smoothing subjects {labels} in one container, task: {task}")
+        cmd = build_container_command(container_config, build_smooth_args(config, task, bundle), context, session)
+        if run_command(cmd):
+            print(f"✅ Smoothing completed for subjects {labels}, task {task}")
+        else:
+            print(f"⚠️  Smoothing failed for bundle {labels}, task {task}. Continuing with next step.")
+            log_error_non_fatal(f"Smoothing failed for subjects {labels}, task {task}")
+
+    if 'stats' in args.action:
+        ready = []
+        for subject_label in bundle:
+            if has_smoothed_data(config, subject_label, config.SPACE):
+                ready.append(subject_label)
+            else:
+                print(f"❌ Smoothed data for main SPACE '{config.SPACE}' not found for subject {subject_label}. Run smoothing first!")
+        if not ready:
+            return
+
+        labels = ", ".join(ready)
+        print(f">>> Running stats for subjects {labels} in one container, task: {task}")
+        stats_args = build_stats_args(config, task, ready, context.model_container_path)
+        cmd = build_container_command(container_config, stats_args, context, session)
+        if run_command(cmd):
+            print(f"✅ Stats completed for subjects {labels}, task {task}")
+        else:
+            print(f"⚠️  Stats failed for bundle {labels}, task {task}. Continuing with next step.")
+            log_error_non_fatal(f"Stats failed for subjects {labels}, task {task}")
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    """Split items into consecutive lists of at most `size` elements"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class _ThreadBufferedStream(io.TextIOBase):
+    """sys.stdout/sys.stderr stand-in that lets a worker thread collect its output in its own buffer.
+
+    Wrappers sharing one `local` also share each thread's buffer, so stdout and
+    stderr writes are replayed in the order they happened, each to its own stream.
+    Threads without a buffer write straight through to the wrapped stream.
+    """
+
+    def __init__(self, stream, local: threading.local):
+        self._stream = stream
+        self._local = local
+
+    def write(self, s):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(s)
+        buffer.append((self._stream, s))
+        return len(s)
+
+    def flush(self):
+        self._stream.flush()
+
+    def is_buffering(self) -> bool:
+        """Whether the calling thread's output is being collected"""
+        return getattr(self._local, "buffer", None) is not None
+
+    def run_buffered(self, func, *args) -> List[tuple]:
+        """Run func(*args), returning its (stream, text) writes; on error they are written through first"""
+        self._local.buffer = []
+        try:
+            func(*args)
+        except BaseException:
+            _replay_output(self._local.buffer)
+            raise
+        finally:
+            output = self._local.buffer
+            self._local.buffer = None
+        return output
+
+
+def _replay_output(output: List[tuple]):
+    """Write the (stream, text) chunks collected by _ThreadBufferedStream.run_buffered()"""
+    streams = []
+    for stream, text in output:
+        stream.write(text)
+        if stream not in streams:
+            streams.append(stream)
+    for stream in streams:
+        stream.flush()
+
+
+def run_subjects_parallel(jobs: int, worker, work_units: list):
+    """Call worker(unit) for every work unit (a subject or a bundle) with up to `jobs` threads.
+
+    Each unit's console output (stdout and stderr) is buffered and printed as one
+    block when the unit finishes, so parallel subjects do not interleave. Container
+    output goes to the log file only (see log_output()), which receives every line
+    as it happens.
+
+    If a unit fails, units that have not started yet are cancelled, running ones
+    are waited for, and the output of every finished unit is still printed.
+    """
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    local = threading.local()
+    buffered_stdout = _ThreadBufferedStream(real_stdout, local)
+    printed = set()
+
+    def print_output(future):
+        with _LOG_LOCK:
+            _replay_output(future.result())
+        printed.add(future)
+
+    sys.stdout = buffered_stdout
+    sys.stderr = _ThreadBufferedStream(real_stderr, local)
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    futures = []
+    try:
+        for unit in work_units:
+            futures.append(executor.submit(buffered_stdout.run_buffered, worker, unit))
+        for future in as_completed(futures):
+            print_output(future)
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future in futures:
+            if future not in printed and not future.cancelled() and future.exception() is None:
+                print_output(future)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+
+
+def select_subjects(args, config: Config, fmriprep_index: Dict[str, Dict[str, set]]) -> List[str]:
+    """Choose the subjects of this run once, for all tasks.
+
+    Auto-discovery uses the subjects of the fMRIPrep index (sorted, from the
+    same directory listing), so the derivatives are not listed again per task.
+    """
+    if args.pilot:
+        # Pilot mode: one random subject, the same one for every task
+        candidates = config.SUBJECTS or list(fmriprep_index)
+        if not candidates:
+            log_error("No subjects found for pilot mode.")
+        pilot_subject = random.choice(candidates)
+        log_debug("Pilot mode: selected random subject %s", pilot_subject)
+        print(f">>> PILOT MODE: Processing random subject: {pilot_subject}")
+        return [pilot_subject]
+    if config.SUBJECTS:
+        # Use specific subjects from config
+        labels = ", ".join(config.SUBJECTS)  # Joined once, the console message needs it as well
+        log_debug("Processing specific subjects: %s", labels)
+        print(f">>> Processing specific subjects: {labels}")
+        return config.SUBJECTS
+    # Auto-discover all subjects from fmriprep derivatives
+    subjects = list(fmriprep_index)
+    if DEBUG:  # The join is only needed for the debug message
+        log_debug("Auto-discovered subjects: %s", ", ".join(subjects))
+    print(f">>> Auto-discovered {len(subjects)} subjects")
+    return subjects
+
+
+def run_tasks(args, config: Config, container_config: ContainerConfig, context: RunContext,
+              session: Optional[ContainerSession] = None):
+    """Run the selected actions for every task and subject"""
+    fmriprep_index = build_fmriprep_index(config.FMRIPREP_DIR)  # One walk shared by all tasks
+    subjects_to_process = select_subjects(args, config, fmriprep_index)
+    slurm_job_ids = []
+
+    if 'smooth' in args.action:
+        # For smoothing, use the original fMRIPrep directory, not bidspm-preproc
+        # BIDSPM needs access to the raw fMRIPrep output for smoothing (same for every subject and task)
+        fmriprep_source = config.DERIVATIVES_DIR / "fmriprep"
+        if not fmriprep_source.exists():
+            print(f"⚠️  fMRIPrep directory not found at {fmriprep_source}")
+            print(f"   Current FMRIPREP_DIR setting: {config.FMRIPREP_DIR}")
+            print("   For smoothing, BIDSPM needs the original fMRIPrep output")
+
+    for task in config.TASKS:
+        print("---------------------------------------------------")
+        print(f">>> Processing task: {task}")
+        print("---------------------------------------------------")
+
+        # Validate SPACE availability before processing
+        if not validate_space_availability(config, subjects_to_process, task, fmriprep_index):
+            print(f"⚠️  Skipping task '{task}' due to SPACE validation failure")
+            continue
+
+        # With Slurm, the task's steps are submitted as jobs instead of being run here
+        if args.scheduler == "slurm":
+            slurm_job_ids.extend(submit_slurm(args, config, container_config, context, task, subjects_to_process))
+            continue
+
+        # ROI analysis needs per-subject invocations, so it is never batched
+        if args.batch_subjects and not config.ROI:
+            process_subjects_batched(args, config, container_config, context, task, subjects_to_process, session)
+        else:
+            if args.batch_subjects:
+                print("⚠️  --batch-subjects is not supported with ROI analysis, processing subjects one by one")
+            # Work units are single subjects or, with --bundle-size, bundles of subjects (not for ROI analysis).
+            # Each unit runs its own steps in order; units run in parallel with --jobs.
+            if args.bundle_size > 1 and not config.ROI:
+                worker = functools.partial(process_subject_bundle, args, config, container_config, context, task,
+                                           session=session)
+                work_units = _chunks(subjects_to_process, args.bundle_size)
+            else:
+                if args.bundle_size > 1:
+                    print("⚠️  --bundle-size is not supported with ROI analysis, processing subjects one by one")
+                worker = functools.partial(process_subject, args, config, container_config, context, task,
+                                           session=session)
+                work_units = subjects_to_process
+            if args.jobs > 1:
+                run_subjects_parallel(args.jobs, worker, work_units)
+            else:
+                for unit in work_units:
+                    worker(unit)
+
+        if 'dataset' in args.action:
+            print(f">>> Running stats on dataset: task: {task}")
+            dataset_args = build_dataset_args(config, task, context.model_container_path)
+            cmd = build_container_command(container_config, dataset_args, context, session)
+            success = run_command(cmd)
+            if not success:
+                print(f"⚠️  Dataset stats failed for task {task}. Check logs for details.")
+                log_error_non_fatal(f"Dataset stats failed for task {task}")
+            else:
+                print(f"✅ Dataset stats completed for task {task}")
+
+    if slurm_job_ids and args.wait:
+        wait_for_slurm_jobs(slurm_job_ids, config.WD / "jobs")
+
+
+# ------------------------------
+# Slurm Submission
+# ------------------------------
+
+_SHELL_VAR_RE = re.compile(r'(\$\{\w+\})')
+
+
+def _shell_join(cmd: List[str]) -> str:
+    """Join a command for a job script: arguments are quoted, but ${VAR} references stay expandable"""
+    def quote(arg):
+        return "".join(f'"{part}"' if _SHELL_VAR_RE.fullmatch(part) else shlex.quote(part)
+                       for part in _SHELL_VAR_RE.split(arg) if part) or "''"
+    return " ".join(quote(arg) for arg in cmd)
+
+
+def write_slurm_array_script(args, config: Config, container_config: ContainerConfig, context: RunContext,
+                             task: str, subjects: List[str], job_dir: Path) -> Path:
+    """Write the sbatch script for the subject-level steps of one task, one array task per subject.
+
+    The subject labels are embedded in the script, so a later submission cannot change
+    the subjects of array tasks that are still pending. Array task i runs the selected
+    steps for subject i in order; a failed step fails the array task.
+    """
+    array = f"1-{len(subjects)}"
+    if args.array_limit:
+        array += f"%{args.array_limit}"
+    # Each array task creates its own tmp directory when it starts (removed later by cleanup_tmp_directories)
+    run_tmp_dir = f"{context.tmp_base}/run_slurm_${{SLURM_ARRAY_JOB_ID}}_${{SLURM_ARRAY_TASK_ID}}"
+
+    lines = [
+        "#!/bin/bash",
+        f"#SBATCH --job-name=bidspm_{task}",
+        f"#SBATCH --array={array}",
+        f"#SBATCH --output={job_dir}/bidspm_{task}_%A_%a.log",
+        "set -e",
+        f"SUBJECTS=({' '.join(shlex.quote(s) for s in subjects)})",
+        'SUB_ID="${SUBJECTS[$((SLURM_ARRAY_TASK_ID - 1))]}"',
+        '[ -n "$SUB_ID" ] || { echo "No subject for array task ${SLURM_ARRAY_TASK_ID}" >&2; exit 1; }',
+        f"mkdir -p {_shell_join([run_tmp_dir])}"
+    ]
+    if 'smooth' in args.action:
+        smooth_args = build_smooth_args(config, task, ["${SUB_ID}"])
+        lines.append(_shell_join(build_container_command(container_config, smooth_args, context,
+                                                         run_tmp_dir=run_tmp_dir)))
+    if 'stats' in args.action:
+        stats_args = build_stats_args(config, task, ["${SUB_ID}"], context.model_container_path)
+        lines.append(_shell_join(build_container_command(container_config, stats_args, context,
+                                                         run_tmp_dir=run_tmp_dir)))
+
+    script_path = job_dir / f"bidspm_{task}_{_RUN_STAMP}.sh"
+    script_path.write_text("\n".join(lines) + "\n")
+    return script_path
+
+
+def write_slurm_dataset_script(config: Config, container_config: ContainerConfig, context: RunContext,
+                               task: str, job_dir: Path) -> Path:
+    """Write the sbatch script for the dataset-level stats of one task"""
+    run_tmp_dir = f"{context.tmp_base}/run_slurm_${{SLURM_JOB_ID}}"
+    dataset_args = build_dataset_args(config, task, context.model_container_path)
+    lines = [
+        "#!/bin/bash",
+        f"#SBATCH --job-name=bidspm_{task}_dataset",
+        f"#SBATCH --output={job_dir}/bidspm_{task}_dataset_%j.log",
+        "set -e",
+        f"mkdir -p {_shell_join([run_tmp_dir])}",
+        _shell_join(build_container_command(container_config, dataset_args, context,
+                                            run_tmp_dir=run_tmp_dir))
+    ]
+    script_path = job_dir / f"bidspm_{task}_dataset_{_RUN_STAMP}.sh"
+    script_path.write_text("\n".join(lines) + "\n")
+    return script_path
+
+
+def sbatch(script_path: Path, after: Optional[str] = None) -> str:
+    """Submit a job script and return its job id; `after` makes it wait for that job to succeed"""
+    cmd = ["sbatch", "--parsable"]
+    if after:
+        # A failed subject-level job cancels the dependent job instead of leaving it pending forever
+        cmd.extend([f"--dependency=afterok:{after}", "--kill-on-invalid-dep=yes"])
+    cmd.append(str(script_path))
+    log_debug("Submitting job: %s", shlex.join(cmd))
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        log_error(f"sbatch failed for {script_path}: {result.stderr.strip()}")
+    return result.stdout.strip().split(";")[0]  # --parsable prints "jobid[;cluster]"
+
+
+def submit_slurm(args, config: Config, container_config: ContainerConfig, context: RunContext,
+                 task: str, subjects: List[str]) -> List[str]:
+    """Submit the selected steps of one task to Slurm and return the submitted job ids.
+
+    Smoothing/stats become one array job with a task per subject; dataset stats is a
+    separate job that starts after the whole array job has succeeded.
+    """
+    job_dir = config.WD / "jobs"
+    job_dir.mkdir(exist_ok=True)
+    job_ids = []
+
+    if not subjects and ('smooth' in args.action or 'stats' in args.action):
+        print(f"⚠️  No subjects to submit for task '{task}', skipping the subject-level array job")
+    elif 'smooth' in args.action or 'stats' in args.action:
+        script_path = write_slurm_array_script(args, config, container_config, context, task, subjects, job_dir)
+        job_ids.append(sbatch(script_path))
+        print(f"📤 Submitted {script_path} as Slurm array job {job_ids[-1]} ({len(subjects)} subjects)")
+
+    if 'dataset' in args.action:
+        script_path = write_slurm_dataset_script(config, container_config, context, task, job_dir)
+        job_ids.append(sbatch(script_path, after=job_ids[0] if job_ids else None))
+        print(f"📤 Submitted {script_path} as Slurm job {job_ids[-1]}")
+
+    return job_ids
+
+
+def _slurm_job_queued(job_id: str) -> bool:
+    """Check whether a job (or any task of an array job) is still pending or running"""
+    result = subprocess.run(["squeue", "-h", "-j", job_id], capture_output=True, text=True)
+    # squeue rejects a job id that has already left the queue, so an error also means "done"
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+
+def _failed_slurm_jobs(job_ids: List[str]) -> Optional[List[str]]:
+    """Return the jobs/array tasks that did not end COMPLETED, or None if sacct cannot tell"""
+    if not shutil.which("sacct"):
+        return None
+    result = subprocess.run(["sacct", "-n", "-P", "-X", "-j", ",".join(job_ids), "-o", "JobID,State"],
+                            capture_output=True, text=True)
+    if result.returncode != 0 or not result.stdout.strip():  # e.g. job accounting is disabled
+        return None
+    failed = []
+    for line in result.stdout.splitlines():
+        job_id, _, state = line.partition("|")
+        if state and state.split()[0] != "COMPLETED":  # State may read "CANCELLED by <uid>"
+            failed.append(f"{job_id} ({state})")
+    return failed
+
+
+def wait_for_slurm_jobs(job_ids: List[str], job_dir: Path):
+    """Poll squeue until none of the submitted jobs is pending or running, then report failed ones"""
+    print(f">>> Waiting for Slurm jobs {', '.join(job_ids)} to finish...")
+    pending = list(job_ids)
+    while pending:
+        time.sleep(SLURM_POLL_INTERVAL)
+        pending = [job_id for job_id in pending if _slurm_job_queued(job_id)]
+
+    failed = _failed_slurm_jobs(job_ids)
+    if failed is None:
+        print(f">>> All Slurm jobs have left the queue. sacct could not report their state, check the job logs in {job_dir}")
+    elif failed:
+        print(f"⚠️  Slurm jobs did not complete: {', '.join(failed)}. Check the job logs in {job_dir}")
+        log_error_non_fatal(f"Slurm jobs did not complete: {', '.join(failed)}")
+    else:
+        print(">>> All Slurm jobs completed successfully.")
+
+
 # ------------------------------
 # Main Script
 # ------------------------------
@@ -729,6 +1791,17 @@ def main():
         show_help()
         sys.exit(0)
     
+    # --jobs 0: size the worker pool from the machine (each container is CPU-heavy)
+    if args.jobs == 0:
+        args.jobs = max(1, (os.cpu_count() or 2) // 2)
+
+    # A session mounts one /tmp (HOME, MATLAB/Octave prefs and caches) for all its calls,
+    # so parallel calls in it would share that state
+    if args.reuse_container and args.jobs > 1 and args.scheduler == "local":
+        print("❌ --reuse-container cannot be combined with --jobs > 1: all calls in the session share one /tmp and HOME.")
+        print("   Use --jobs without --reuse-container, or --reuse-container with --jobs 1.")
+        sys.exit(1)
+
     # Use specified config files or look for defaults
     config_file = args.settings if args.settings else CONFIG_FILE
 
@@ -742,11 +1815,11 @@ def main():
     # Check if configuration files exist and are valid JSON
     missing_files = []
     invalid_json_files = []
-    if not Path(config_file).exists():
+    if not _path_exists(os.fspath(config_file)):
         missing_files.append(config_file)
     elif not JSONValidator.is_valid_json(config_file):
         invalid_json_files.append(config_file)
-    if not Path(container_config_file).exists():
+    if not _path_exists(os.fspath(container_config_file)):
         missing_files.append(container_config_file)
     elif not JSONValidator.is_valid_json(container_config_file):
         invalid_json_files.append(container_config_file)
@@ -774,16 +1847,13 @@ def main():
     except ImportError:
         print("⚠️  Skipping schema validation: jsonschema package is not installed.")
 
-    # Dependency Checks
-    check_command("python3")
-
     # Load configurations
     config = load_config(config_file)
     container_config = load_container_config(container_config_file)
 
     # Setup Octave compatibility for older containers
     log("🔧 Setting up Octave compatibility...")
-    setup_octave_compatibility(container_config)
+    setup_octave_compatibility(config, container_config)
 
     # Validate MODELS_FILE or -m
     if not args.model and not config.MODELS_FILE:
@@ -821,248 +1891,60 @@ def main():
         check_command("apptainer")
         log_debug(f"Using Apptainer with image: {container_config.apptainer_image}")
 
-    if not model_file_path.exists():
+    if not _path_exists(os.fspath(model_file_path)):
         log_error(f"Model file '{models_file_name}' not found at '{model_file_path}'.")
 
     if not args.skip_modelvalidation:
         log_debug("Validating model JSON against BIDS Stats Model schema")
-        venv_python = Path(".bidspm/bin/python")
-        python_cmd = str(venv_python) if venv_python.exists() else "python3"
-        run_command([python_cmd, "validate_bids_model.py", str(model_file_path)], capture_output=True)
+        validate_model(model_file_path)
     else:
         print("⚠️  Skipping BIDS-StatsModel JSON validation (--skip-modelvalidation flag used)")
 
-    # Path validations
-    if not config.WD.is_dir():
-        log_error(f"Working directory '{config.WD}' does not exist.")
-    if not config.BIDS_DIR.is_dir():
-        log_error(f"BIDS directory '{config.BIDS_DIR}' does not exist.")
-    if not config.DERIVATIVES_DIR.is_dir():
-        log_error(f"Derivatives directory '{config.DERIVATIVES_DIR}' does not exist.")
-
     # Validate that FMRIPREP_DIR is within DERIVATIVES_DIR
-    if not str(config.FMRIPREP_DIR).startswith(str(config.DERIVATIVES_DIR)):
+    if not config.FMRIPREP_DIR.is_relative_to(config.DERIVATIVES_DIR):
         print(f"⚠️  WARNING: FMRIPREP_DIR ({config.FMRIPREP_DIR}) is not within DERIVATIVES_DIR ({config.DERIVATIVES_DIR})")
         print("   Container expects fmriprep at /derivatives/fmriprep inside container")
 
     # Ensure derivatives directory has dataset_description.json to suppress BIDSPM warnings
     ensure_derivatives_dataset_description(config.DERIVATIVES_DIR)
 
-    # Processing loop
-    for task in config.TASKS:
-        print("---------------------------------------------------")
-        print(f">>> Processing task: {task}")
-        print("---------------------------------------------------")
-
-        # Get list of subjects to process
-        if args.pilot:
-            # Pilot mode: use one random subject
-            all_subjects = []
-            if config.SUBJECTS:
-                # Random from specified subjects
-                all_subjects = config.SUBJECTS
-            else:
-                # Random from auto-discovered subjects
-                for sub_dir in config.FMRIPREP_DIR.glob("sub-*"):
-                    if sub_dir.is_dir():
-                        subject_label = sub_dir.name.replace("sub-", "")
-                        all_subjects.append(subject_label)
-            if not all_subjects:
-                log_error("No subjects found for pilot mode.")
-            # Select random subject
-            pilot_subject = random.choice(all_subjects)
-            subjects_to_process = [pilot_subject]
-            log_debug(f"Pilot mode: selected random subject {pilot_subject}")
-            print(f">>> PILOT MODE: Processing random subject: {pilot_subject}")
-        elif config.SUBJECTS:
-            # Use specific subjects from config
-            subjects_to_process = config.SUBJECTS
-            log_debug(f"Processing specific subjects: {', '.join(subjects_to_process)}")
-            print(f">>> Processing specific subjects: {', '.join(subjects_to_process)}")
-        else:
-            # Auto-discover all subjects from fmriprep derivatives
-            subjects_to_process = []
-            for sub_dir in config.FMRIPREP_DIR.glob("sub-*"):
-                if sub_dir.is_dir():
-                    subject_label = sub_dir.name.replace("sub-", "")
-                    subjects_to_process.append(subject_label)
-            log_debug(f"Auto-discovered subjects: {', '.join(subjects_to_process)}")
-            print(f">>> Auto-discovered {len(subjects_to_process)} subjects")
-
-        # Validate SPACE availability before processing
-        if not validate_space_availability(config, subjects_to_process, task):
-            print(f"⚠️  Skipping task '{task}' due to SPACE validation failure")
-            continue
-
-        # Process each subject
-        for subject_label in subjects_to_process:
-            # Check if subject directory exists in fmriprep derivatives
-            subject_dir = config.FMRIPREP_DIR / f"sub-{subject_label}"
-            if not subject_dir.is_dir():
-                print(f">>> WARNING: Subject directory not found for {subject_label}, skipping...")
-                log_debug(f"Subject directory not found: {subject_dir}")
-                continue
-            log_debug(f"Processing subject: {subject_label}, task: {task}")
-
-
-            # ROI analysis block
-            if hasattr(config, "ROI") and config.ROI:
-                roi_config = config.ROI_CONFIG
-                preproc_dir = config.DERIVATIVES_DIR / "bidspm-preproc"
-                
-                # Check if preproc directory exists
-                if not preproc_dir.exists():
-                    print(f"❌ Preprocessing directory not found: {preproc_dir}")
-                    print("   ROI analysis requires smoothed data. Please run smoothing first using the --action smooth option.")
-                    continue
-                
-                # Check for smoothed data for each required space
-                missing_spaces = []
-                for roi_space in roi_config["space"]:
-                    found = False
-                    for ses_dir in (preproc_dir.glob(f"sub-{subject_label}/ses-*/func") if (preproc_dir / f"sub-{subject_label}").exists() else []):
-                        if any(ses_dir.glob(f"*_space-{roi_space}*.nii*")):
-                            found = True
-                            break
-                    if not found:
-                        missing_spaces.append(roi_space)
-                if missing_spaces:
-                    print(f"❌ Smoothed data for ROI space(s) {missing_spaces} not found in {preproc_dir}.")
-                    print(f"   Please run smoothing for space(s) {missing_spaces} first using the --action smooth option and update 'SPACE' in config if needed.")
-                    continue
-
-                # Create ROI
-                roi_args = [
-                    "/raw", "/derivatives", "subject", "create_roi",
-                    "--participant_label", subject_label,
-                    "--preproc_dir", "/derivatives/bidspm-preproc",
-                    "--roi_atlas", roi_config["roi_atlas"],
-                    "--roi_name"
-                ]
-                # Add each ROI name as a separate argument
-                roi_args.extend(roi_config["roi_name"])
-                roi_args.extend(["--space", ",".join(roi_config["space"])])
-                cmd, _ = build_container_command(container_config, config, roi_args, model_file_path)
-                success = run_command(cmd)
-                if not success:
-                    print(f"⚠️  ROI creation failed for subject {subject_label}, task {task}.")
-                    continue
-
-                # Run ROI-based GLM
-                # roi_dir wird nicht mehr benötigt
-                temp_args = []
-                _, model_container_path = build_container_command(container_config, config, temp_args, model_file_path)
-                stats_args = [
-                    "/raw", "/derivatives", "subject", "stats",
-                    "--participant_label", subject_label,
-                    "--preproc_dir", "/derivatives/bidspm-preproc",
-                    "--model_file", model_container_path,
-                    "--roi_based",
-                    "--roi_name"
-                ]
-                # Add each ROI name as a separate argument  
-                stats_args.extend(roi_config["roi_name"])
-                stats_args.extend([
-                    "--roi_dir", "/derivatives/bidspm-roi",
-                    "--space", ",".join(roi_config["space"]),
-                    "--fwhm", "0"
-                ])
-                cmd, _ = build_container_command(container_config, config, stats_args, model_file_path)
-                success = run_command(cmd)
-                if not success:
-                    print(f"⚠️  ROI stats failed for subject {subject_label}, task {task}.")
-                else:
-                    print(f"✅ ROI stats completed for subject {subject_label}, task {task}")
-
-            # Check for smoothed data for main SPACE before stats
-            if 'stats' in args.action:
-                main_space = config.SPACE
-                found = False
-                preproc_dir = config.DERIVATIVES_DIR / "bidspm-preproc"
-                for ses_dir in (preproc_dir.glob(f"sub-{subject_label}/ses-*/func") if (preproc_dir / f"sub-{subject_label}").exists() else []):
-                    if any(ses_dir.glob(f"*_space-{main_space}*.nii*")):
-                        found = True
-                        break
-                if not found:
-                    print(f"❌ Smoothed data for main SPACE '{main_space}' not found in {preproc_dir}. Run smoothing first!")
-                    continue
-
-            if 'smooth' in args.action:
-                print(f">>> Smoothing for subject: {subject_label}, task: {task}")
-                # For smoothing, use the original fMRIPrep directory, not bidspm-preproc
-                # BIDSPM needs access to the raw fMRIPrep output for smoothing
-                fmriprep_source = config.DERIVATIVES_DIR / "fmriprep"
-                if not fmriprep_source.exists():
-                    print(f"⚠️  fMRIPrep directory not found at {fmriprep_source}")
-                    print(f"   Current FMRIPREP_DIR setting: {config.FMRIPREP_DIR}")
-                    print("   For smoothing, BIDSPM needs the original fMRIPrep output")
-                
-                smooth_args = [
-                    "/derivatives/fmriprep", "/derivatives", "subject", "smooth",
-                    "--participant_label", subject_label,
-                    "--task", task,
-                    "--space", config.SPACE,
-                    "--fwhm", str(config.FWHM),
-                    "--verbosity", str(max(0, config.VERBOSITY - 1))  # Reduce verbosity to minimize warnings
-                ]
-                cmd, _ = build_container_command(container_config, config, smooth_args, model_file_path)
-                log_debug(f"Full container command: {' '.join(cmd)}")
-                success = run_command(cmd)
-                if not success:
-                    print(f"⚠️  Smoothing failed for subject {subject_label}, task {task}. Continuing with next step.")
-                    log_error_non_fatal(f"Smoothing failed for subject {subject_label}, task {task}")
-            else:
-                print(f"✅ Smoothing completed for subject {subject_label}, task {task}")
-
-            if 'stats' in args.action:
-                print(f">>> Running stats for subject: {subject_label}, task: {task}")
-                # First build container command to get den korrekten model file path
-                temp_args = []
-                cmd, model_container_path = build_container_command(container_config, config, temp_args, model_file_path)
-                stats_args = [
-                    "/raw", "/derivatives", "subject", "stats",
-                    "--preproc_dir", "/derivatives/bidspm-preproc",
-                    "--model_file", model_container_path,
-                    "--participant_label", subject_label,
-                    "--task", task,
-                    "--space", config.SPACE,
-                    "--fwhm", str(config.FWHM),
-                    "--verbosity", str(config.VERBOSITY)
-                ]
-                cmd, _ = build_container_command(container_config, config, stats_args, model_file_path)
-                success = run_command(cmd)
-                if not success:
-                    print(f"⚠️  Stats failed for subject {subject_label}, task {task}. Continuing with next step.")
-                    log_error_non_fatal(f"Stats failed for subject {subject_label}, task {task}")
-            else:
-                print(f"✅ Stats completed for subject {subject_label}, task {task}")
+    if args.scheduler == "slurm":
+        check_command("sbatch")
+        if args.wait:
+            check_command("squeue")
+        if config.ROI:
+            log_error("ROI analysis is not supported with --scheduler slurm.")
+        if args.reuse_container:
+            print("⚠️  --reuse-container has no effect with --scheduler slurm, every array task starts its own container")
+        for flag, used in (("--batch-subjects", args.batch_subjects), ("--bundle-size", args.bundle_size > 1),
+                           ("--jobs", args.jobs > 1)):
+            if used:
+                print(f"⚠️  {flag} has no effect with --scheduler slurm, every subject runs as its own array task")
+    else:
+        for flag, used in (("--array-limit", args.array_limit is not None), ("--wait", args.wait)):
+            if used:
+                print(f"⚠️  {flag} has no effect without --scheduler slurm")
+        # ROI analysis falls back to per-subject invocations, where --jobs and --bundle-size apply again
+        if args.batch_subjects and not config.ROI:
+            for flag, used in (("--jobs", args.jobs > 1), ("--bundle-size", args.bundle_size > 1)):
+                if used:
+                    print(f"⚠️  {flag} has no effect with --batch-subjects, all subjects of a task run in one container")
 
-        if 'dataset' in args.action:
-            print(f">>> Running stats on dataset: task: {task}")
-            # First build container command to get den korrekten model file path
-            temp_args = []
-            cmd, model_container_path = build_container_command(container_config, config, temp_args, model_file_path)
-            dataset_args = [
-                "/raw", "/derivatives", "dataset", "stats",
-                "--preproc_dir", "/derivatives/bidspm-preproc",
-                "--model_file", model_container_path,
-                "--task", task,
-                "--space", config.SPACE,
-                "--fwhm", str(config.FWHM),
-                "--verbosity", str(config.VERBOSITY)
-            ]
-            cmd, _ = build_container_command(container_config, config, dataset_args, model_file_path)
-            success = run_command(cmd)
-            if not success:
-                print(f"⚠️  Dataset stats failed for task {task}. Check logs for details.")
-                log_error_non_fatal(f"Dataset stats failed for task {task}")
-            else:
-                print(f"✅ Dataset stats completed for task {task}")
+    # Processing loop
+    context = build_run_context(config, container_config, model_file_path)
+    if args.reuse_container and args.scheduler == "local":
+        with ContainerSession(container_config, context) as session:
+            run_tasks(args, config, container_config, context, session)
+    else:
+        run_tasks(args, config, container_config, context)
 
     # Clean up old temporary directories
     cleanup_tmp_directories(config)
 
-    print(f">>> All processing complete. Logs saved to {LOG_FILE}")
+    if args.scheduler == "slurm" and not args.wait:
+        print(f">>> All jobs submitted. Logs saved to {LOG_FILE}, job logs in {config.WD / 'jobs'}")
+    else:
+        print(f">>> All processing complete. Logs saved to {LOG_FILE}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+#!/bin/bash
+
+# build_binary.sh - Build a standalone native bidspm executable with Nuitka
+# The binary starts without walking the Python import graph, which matters
+# when a scheduler (e.g. Slurm) launches one bidspm run per subject.
+
+set -e  # Exit on any error
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+BLUE='\033[0;34m'
+NC='\033[0m' # No Color
+
+print_status() {
+    echo -e "${BLUE}[INFO]${NC} $1"
+}
+
+print_success() {
+    echo -e "${GREEN}[SUCCESS]${NC} $1"
+}
+
+print_error() {
+    echo -e "${RED}[ERROR]${NC} $1"
+}
+
+# Prefer the project virtual environment created by setup.sh
+if [ -x ".bidspm/bin/python" ]; then
+    PYTHON=".bidspm/bin/python"
+else
+    PYTHON="python3"
+fi
+
+OUTPUT_DIR="dist"
+
+main() {
+    if ! "$PYTHON" -m nuitka --version &> /dev/null; then
+        print_error "Nuitka is not installed for $PYTHON."
+        echo "   Install with: $PYTHON -m pip install nuitka"
+        exit 1
+    fi
+
+    print_status "Building native bidspm binary with Nuitka ($PYTHON)..."
+    "$PYTHON" -m nuitka \
+        --onefile \
+        --lto=yes \
+        --assume-yes-for-downloads \
+        --include-module=json_validator \
+        --include-module=validate_bids_model \
+        --output-dir="$OUTPUT_DIR" \
+        --output-filename=bidspm \
+        bidspm.py
+
+    print_success "Binary created: $OUTPUT_DIR/bidspm"
+    echo ""
+    echo "The binary reads config_schema.json from the current directory, like bidspm.py."
+    echo "Usage:"
+    echo "  ./$OUTPUT_DIR/bidspm -s config.json -c container.json --action smooth stats"
+}
+
+main "$@"
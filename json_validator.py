@@ -1,9 +1,46 @@
 
+import hashlib
 import json
+import os
+from pathlib import Path
 try:
     import jsonschema
 except ImportError:
     jsonschema = None
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+try:
+    import ijson
+    _STREAM_ERRORS = (ijson.JSONError,)
+except ImportError:
+    ijson = None
+    _STREAM_ERRORS = ()
+
+# Files at least this large are syntax-checked with ijson (constant memory); smaller ones with json
+STREAMING_MIN_SIZE = 256 * 1024
+
+# Validators built from schema files, keyed by (path, mtime) so an edited schema is reloaded
+_VALIDATOR_CACHE = {}
+
+def cache_dir():
+    """bidspm's cache directory (~/.cache/bidspm or $XDG_CACHE_HOME/bidspm), shared with validate_bids_model"""
+    return Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "bidspm"
+
+def validated_marker(data, schema):
+    """Marker file recording that `data` was valid against `schema` (both raw bytes) in an earlier run"""
+    key = hashlib.blake2b(data + b"\0" + schema, digest_size=16).hexdigest()
+    return cache_dir() / "validated" / key
+
+def touch_marker(marker):
+    """Create a validation marker; if that fails, the file is simply validated again next time"""
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+    except OSError:
+        pass
 
 class JSONValidator:
     """
@@ -14,20 +51,28 @@ class JSONValidator:
     def is_valid_json(filepath) -> bool:
         """
         Checks if the given file contains valid JSON.
+        Large files are stream-parsed with ijson (if installed) without building the document,
+        smaller ones are parsed with orjson (if installed) or json.
         :param filepath: Path to JSON file (str or Path)
         :return: True if file contains valid JSON, else False
         """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                json.load(f)
+            if ijson is not None and os.path.getsize(filepath) >= STREAMING_MIN_SIZE:
+                with open(filepath, 'rb') as f:
+                    for _ in ijson.parse(f):
+                        pass
+                return True
+            with open(filepath, 'rb') as f:
+                _loads(f.read())
             return True
-        except (json.JSONDecodeError, FileNotFoundError, OSError):
+        except (ValueError, OSError, *_STREAM_ERRORS):
             return False
 
     @staticmethod
     def validate_with_schema(json_path, schema_path) -> bool:
         """
         Validates a JSON file against a JSON schema file.
+        Files that were already valid against the same schema content are not validated again.
         :param json_path: Path to the JSON file
         :param schema_path: Path to the JSON schema file (template)
         :return: True if valid, False if invalid or error
@@ -35,11 +80,32 @@ class JSONValidator:
         if jsonschema is None:
             raise ImportError("jsonschema package is not installed. Please install it (e.g. via setup.sh)")
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            with open(schema_path, 'r', encoding='utf-8') as f:
-                schema = json.load(f)
-            jsonschema.validate(instance=data, schema=schema)
-            return True
+            with open(json_path, 'rb') as f:
+                raw = f.read()
+            with open(schema_path, 'rb') as f:
+                marker = validated_marker(raw, f.read())
+            if marker.exists():
+                return True
+            valid = JSONValidator._get_validator(schema_path).is_valid(_loads(raw))
+            if valid:
+                touch_marker(marker)
+            return valid
         except Exception:
             return False
+
+    @staticmethod
+    def _get_validator(schema_path):
+        """
+        Returns the validator for a schema file, building it only once per file version.
+        :param schema_path: Path to the JSON schema file
+        :return: jsonschema validator instance
+        """
+        key = (os.fspath(schema_path), os.path.getmtime(schema_path))
+        validator = _VALIDATOR_CACHE.get(key)
+        if validator is None:
+            with open(schema_path, 'rb') as f:
+                schema = _loads(f.read())
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = _VALIDATOR_CACHE[key] = validator_class(schema)
+        return validator
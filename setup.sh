@@ -36,18 +36,18 @@ check_os() {
     print_success "Cross-platform setup (no sudo required)"
 }
 
-# Check if Python 3.8+ is available
+# Check if Python 3.9+ is available
 check_python() {
     if ! command -v python3 &> /dev/null; then
-        print_error "Python 3 is not installed. Please install Python 3.8 or higher."
+        print_error "Python 3 is not installed. Please install Python 3.9 or higher."
         exit 1
     fi
     
     python_version=$(python3 -c "import sys; print(f'{sys.version_info.major}.{sys.version_info.minor}')")
-    required_version="3.8"
+    required_version="3.9"
     
-    if ! python3 -c "import sys; exit(0 if sys.version_info >= (3, 8) else 1)"; then
-        print_error "Python ${python_version} detected. Python 3.8 or higher is required."
+    if ! python3 -c "import sys; exit(0 if sys.version_info >= (3, 9) else 1)"; then
+        print_error "Python ${python_version} detected. Python 3.9 or higher is required."
         exit 1
     fi
     
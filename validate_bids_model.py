@@ -1,28 +1,132 @@
 # validate_bids_model.py
+import functools
+import gzip
+import hashlib
 import json
+import os
 import sys
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from json_validator import cache_dir, touch_marker, validated_marker
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 try:
-    import requests
-    from jsonschema import validate, ValidationError, RefResolver
+    from jsonschema import ValidationError, RefResolver
+    from jsonschema.exceptions import best_match
+    from jsonschema.validators import validator_for
     VALIDATION_AVAILABLE = True
 except ImportError as e:
     VALIDATION_AVAILABLE = False
     MISSING_MODULES = str(e)
 
+SCHEMA_URL = "https://bids-standard.github.io/stats-models/BIDSStatsModel.json"
+SCHEMA_CACHE_MAX_AGE = 24 * 3600  # Seconds before a cached schema is revalidated with the server
+
+def _schema_cache_path(url):
+    return cache_dir() / (hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+def _write_schema_cache(cache_path, body, etag):
+    """Store the downloaded schema (atomically) and its ETag; the cache is optional, so errors are ignored"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, cache_path)
+        etag_path = cache_path.with_suffix(".etag")
+        if etag:
+            etag_path.write_text(etag)
+        elif etag_path.exists():
+            etag_path.unlink()
+    except OSError:
+        pass
+
+@functools.lru_cache(maxsize=4)
+def _load_schema_bytes(url):
+    """Return the raw schema at `url`, from ~/.cache/bidspm when it is fresh or unchanged (ETag)"""
+    cache_path = _schema_cache_path(url)
+    etag_path = cache_path.with_suffix(".etag")
+    cached = cache_path.exists()
+    if cached and time.time() - cache_path.stat().st_mtime < SCHEMA_CACHE_MAX_AGE:
+        return cache_path.read_bytes()
+
+    # urllib is enough for this single GET and avoids importing requests
+    headers = {"Accept-Encoding": "gzip", "User-Agent": "bidspm-runner"}
+    if cached and etag_path.exists():
+        headers["If-None-Match"] = etag_path.read_text().strip()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=30) as response:
+            body = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            etag = response.headers.get("ETag")
+    except HTTPError as e:
+        if not cached:
+            raise
+        if e.code == 304:
+            cache_path.touch()  # Unchanged on the server: the cached copy is fresh again
+        else:
+            print(f"⚠️  Schema server returned HTTP {e.code}, using the cached BIDS Stats Model schema.")
+        return cache_path.read_bytes()
+    except (URLError, OSError):
+        if cached:
+            print("⚠️  Could not reach the schema server, using the cached BIDS Stats Model schema.")
+            return cache_path.read_bytes()
+        raise
+
+    _loads(body)  # Only cache a schema that parses
+    _write_schema_cache(cache_path, body, etag)
+    return body
+
+@functools.lru_cache(maxsize=4)
+def _load_schema(url):
+    """Return the parsed schema at `url`"""
+    return _loads(_load_schema_bytes(url))
+
+def get_schema():
+    """Return the BIDS Stats Model schema (cached in-process and on disk)"""
+    return _load_schema(SCHEMA_URL)
+
+@functools.lru_cache(maxsize=4)
+def _get_validator(url):
+    """Build the validator for the schema at `url` once; the schema itself is checked only here"""
+    schema = _load_schema(url)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+def get_validator():
+    """Return the cached validator for the BIDS Stats Model schema"""
+    return _get_validator(SCHEMA_URL)
+
 def validate_json(model_path):
     if not VALIDATION_AVAILABLE:
         print(f"⚠️  Warning: BIDS-StatsModel validation skipped due to missing dependencies: {MISSING_MODULES}")
-        print("   Install with: pip install requests jsonschema")
+        print("   Install with: pip install jsonschema")
         print("   Or use --skip-modelvalidation flag to suppress this warning.")
         return
     
-    schema_url = "https://bids-standard.github.io/stats-models/BIDSStatsModel.json"
     try:
-        schema = requests.get(schema_url).json()
-        with open(model_path, "r") as f:
-            model = json.load(f)
-        validate(instance=model, schema=schema)
+        with open(model_path, "rb") as f:
+            raw = f.read()
+        # Skip the schema walk for a model that already passed against the same schema
+        marker = validated_marker(raw, _load_schema_bytes(SCHEMA_URL))
+        if marker.exists():
+            print("✅ The model JSON is valid according to the BIDS Stats Model schema (unchanged since last validation).")
+            return
+        validator = get_validator()
+        model = _loads(raw)
+        # Same error selection as jsonschema.validate(), without rebuilding the validator
+        error = best_match(validator.iter_errors(model))
+        if error is not None:
+            raise error
+        touch_marker(marker)
         print("✅ The model JSON is valid according to the BIDS Stats Model schema.")
     except ValidationError as e:
         # Allow non-standard transformer error